@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import secrets
+
+import db
+
+# Append-only record of every scored chat turn in app.py / project.py.
+# district_feedback / justice_feedback only keep per-category scores; this keeps
+# the answer text (and the English text that was actually scored, answer_en)
+# next to the score it got, keyed by the chat's session_key
+# (also stored on the feedback row), so history can be re-scored (rescore.py)
+# and exported in full (powerbiapp.py /api/answers/export).
+
+SOURCES = ("district_feedback", "justice_feedback")
+
+ANSWERS_DDL = """
+CREATE TABLE IF NOT EXISTS feedback_answers (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    session_key CHAR(32) NOT NULL,
+    source VARCHAR(32) NOT NULL,
+    district VARCHAR(255),
+    category VARCHAR(64) NOT NULL,
+    answer TEXT,
+    answer_en TEXT,
+    score FLOAT,
+    sentiment VARCHAR(16),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_session_key (session_key),
+    INDEX idx_source_created (source, created_at)
+)
+"""
+
+ANSWER_COLUMNS = ("session_key", "source", "district", "category", "answer", "answer_en", "score", "sentiment")
+INSERT_ANSWER = (f"INSERT INTO feedback_answers ({', '.join(ANSWER_COLUMNS)}) "
+                 f"VALUES ({', '.join(['%s'] * len(ANSWER_COLUMNS))})")
+
+# Column widths checked by the chat apps before a row is queued, so an oversized
+# client-supplied value is refused up front instead of failing in the writer
+DISTRICT_MAX = 255
+CATEGORY_MAX = 64
+
+def too_long(district=None, category=None):
+    return len(district or "") > DISTRICT_MAX or len(category or "") > CATEGORY_MAX
+
+EXPORT_COLUMNS = ("id",) + ANSWER_COLUMNS + ("created_at",)
+EXPORT_CHUNK_SIZE = 2000
+
+# app.py categories with their own district_feedback column (<category>_score)
+DISTRICT_SCORE_CATEGORIES = ("trust", "responsiveness", "infrastructure", "public_services", "safety",
+                             "environment", "transport", "community", "economic")
+# project.py categories with their own justice_feedback column
+JUSTICE_SCORE_CATEGORIES = ("trust", "responsiveness", "fairness", "accessibility", "corruption",
+                            "community_justice")
+# app.py justice questions, averaged into district_feedback.justice_score
+DISTRICT_JUSTICE_CATEGORIES = ("justice", "fairness", "accessibility", "corruption", "community_justice",
+                               "justice_suggestions")
+
+
+def new_session_key():
+    return secrets.token_hex(16)
+
+def session_key(session_data):
+    # Sessions started before keys existed get one on their next turn
+    return session_data.setdefault("session_key", new_session_key())
+
+def ensure_tables(source):
+    # feedback_answers, plus session_key on an existing feedback table from before it
+    # (and answer_en on a feedback_answers table from before that)
+    with db.cursor(commit=True) as cur:
+        cur.execute(ANSWERS_DDL)
+        cur.execute("SHOW COLUMNS FROM feedback_answers LIKE 'answer_en'")
+        if not cur.fetchall():
+            cur.execute("ALTER TABLE feedback_answers ADD COLUMN answer_en TEXT")
+        cur.execute(f"SHOW COLUMNS FROM {source} LIKE 'session_key'")
+        if not cur.fetchall():
+            cur.execute(f"ALTER TABLE {source} ADD COLUMN session_key CHAR(32), "
+                        f"ADD INDEX idx_session_key (session_key)")
+
+
+# ------------------ Export ------------------
+def export_query(source=None, district=None, start=None, end=None, after_id=None):
+    if source is not None and source not in SOURCES:
+        raise ValueError(f"Unknown source {source!r}")
+    where, params = [], []
+    for clause, value in (("source = %s", source), ("district = %s", district), ("created_at >= %s", start),
+                          ("created_at < %s", end), ("id > %s", after_id)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM feedback_answers"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY id", tuple(params)
+
+def export_chunks(chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    # Row tuples in EXPORT_COLUMNS order, chunk by chunk, off a server-side cursor
+    sql, params = export_query(**filters)
+    return db.stream(sql, params, chunk_size)
+
+# Both yield one string per chunk, so the response is written in a few large
+# pieces; closing them early (client went away) releases the DB connection.
+def ndjson_lines(chunks):
+    try:
+        for rows in chunks:
+            yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str) + "\n"
+                          for row in rows)
+    finally:
+        chunks.close()
+
+def csv_lines(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    try:
+        yield buffer.getvalue()
+        for rows in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+    finally:
+        chunks.close()
+
+
+# ------------------ Aggregates ------------------
+# Shared by the apps (on completion) and rescore.py (after re-scoring)
+def district_summary(district_scores, justice_scores, history):
+    # (sentiment_score, justice_score, justice_sentiment, overall_score) for district_feedback
+    d_scores = [v for v in district_scores.values() if v is not None]
+    j_scores = [v for v in justice_scores.values() if v is not None]
+    sentiment_score = round(sum(d_scores)/len(d_scores), 2) if d_scores else 0
+    justice_score = round(sum(j_scores)/len(j_scores), 2) if j_scores else 0
+
+    justice_sentiment_counts = {"positive":0,"neutral":0,"negative":0}
+    for entry in history:
+        if entry["category"] in justice_scores:
+            justice_sentiment_counts[entry["sentiment"]] += 1
+    justice_sentiment = max(justice_sentiment_counts, key=justice_sentiment_counts.get)
+    overall_score = round((sentiment_score + justice_score)/2, 2)
+    return sentiment_score, justice_score, justice_sentiment, overall_score
+
+def justice_overall(justice_scores):
+    # overall_score for justice_feedback: mean of every answered category except suggestions
+    scores = [v for k, v in justice_scores.items() if k != "justice_suggestions" and v is not None]
+    return round(sum(scores)/len(scores), 2) if scores else None
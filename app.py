@@ -1,23 +1,25 @@
 from flask import Flask, render_template, request, jsonify
-from textblob import TextBlob
 from googletrans import Translator
-import mysql.connector
 import random
+import answers
+import db
+import faq
+import metrics
+from feedback_writer import FeedbackWriter
+import scoring
+import sessions
+import translation
 
 app = Flask(__name__)
-translator = Translator()
-
-# MySQL connection
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="chatbot_db"
-)
-cursor = conn.cursor()
+# googletrans behind a concurrency limit, deadlines and a circuit breaker
+gateway = translation.TranslationGateway(Translator())
+translator = translation.CachedTranslator(gateway)
+pipeline = translation.TranslationPipeline(translator)
+session_store = sessions.store_from_env()
+fact_index = faq.FactIndex()
 
 # Create table
-cursor.execute("""
+db.execute("""
 CREATE TABLE IF NOT EXISTS district_feedback (
     id INT AUTO_INCREMENT PRIMARY KEY,
     district VARCHAR(255),
@@ -33,10 +35,35 @@ CREATE TABLE IF NOT EXISTS district_feedback (
     sentiment_score INT,
     justice_score INT,
     justice_sentiment VARCHAR(50),
-    overall_score FLOAT
+    overall_score FLOAT,
+    session_key CHAR(32),
+    INDEX idx_session_key (session_key)
 )
 """)
 
+# Completed sessions are inserted in batches by a background writer
+INSERT_FEEDBACK = """
+    INSERT INTO district_feedback (
+        district, trust_score, responsiveness_score, infrastructure_score,
+        public_services_score, safety_score, environment_score, transport_score,
+        community_score, economic_score, sentiment_score, justice_score,
+        justice_sentiment, overall_score, session_key
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+answers.ensure_tables("district_feedback")
+feedback_writer = FeedbackWriter(INSERT_FEEDBACK, spool_path="district_feedback.spool").start()
+# Every scored turn, with its answer text (for re-scoring and export)
+answer_writer = FeedbackWriter(answers.INSERT_ANSWER, spool_path="district_answers.spool").start()
+
+# /metrics: request, translation, scoring and insert timings plus pool / cache / writer stats
+metrics.install(app)
+metrics.register_gauges("lawbot_db_pool", db.stats)
+metrics.register_gauges("lawbot_feedback_writer", lambda: feedback_writer.stats, writer=feedback_writer.name)
+metrics.register_gauges("lawbot_feedback_writer", lambda: answer_writer.stats, writer=answer_writer.name)
+metrics.register_gauges("lawbot_translator", translator.stats)
+metrics.register_gauges("lawbot_translation_pipeline", pipeline.stats)
+metrics.register_gauges("lawbot_translate_gateway", gateway.stats)
+
 # Questions
 district_questions = {
     "trust": "How much do you trust your local administration?",
@@ -59,59 +86,54 @@ justice_questions = {
     "justice_suggestions": "What changes would make justice more effective in your district?"
 }
 
-keywords_dict = {
-    "trust": ["trust", "honest", "transparent", "reliable"],
-    "responsiveness": ["fast", "responsive", "quick", "helpful"],
-    "infrastructure": ["road", "transport", "building", "infrastructure", "utilities"],
-    "public_services": ["health", "education", "hospital", "school", "sanitation"],
-    "safety": ["safe", "security", "police", "crime", "danger"],
-    "environment": ["clean", "pollution", "green", "environment", "waste"],
-    "transport": ["bus", "train", "road", "traffic", "transport"],
-    "community": ["community", "participation", "citizen", "involvement"],
-    "economic": ["job", "business", "opportunity", "economy", "market"],
-    "justice": ["justice", "law", "fair", "rights", "court", "equality"]
-}
+keywords_dict = scoring.DISTRICT_KEYWORDS
 
 # NLP scoring
+keyword_index = scoring.build_keyword_index(keywords_dict)
+
 def keyword_score(text, category):
-    words = text.lower().split()
-    matches = sum(word in words for word in keywords_dict.get(category, []))
-    return min(matches + 1, 5)
+    return scoring.keyword_score(text, category, keyword_index)
 
+@metrics.timed("lawbot_score_seconds")
 def analyze_score(text, category):
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity <= -0.6: polarity_score = 1
-    elif polarity <= -0.2: polarity_score = 2
-    elif polarity <= 0.2: polarity_score = 3
-    elif polarity <= 0.6: polarity_score = 4
-    else: polarity_score = 5
-    k_score = keyword_score(text, category)
-    return round((polarity_score + k_score) / 2, 2)
+    return scoring.score_answer(text, category, keyword_index).score
 
 def analyze_sentiment(text):
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity > 0.1: return "positive"
-    elif polarity < -0.1: return "negative"
-    else: return "neutral"
+    return scoring.sentiment_label(scoring.polarity_of(text))
 
-def select_next_category(scores_dict):
-    unanswered = [k for k, v in scores_dict.items() if v is None]
+def select_next_category(scores_dict, answered=None):
+    unanswered = [k for k, v in scores_dict.items() if v is None and k != answered]
     return random.choice(unanswered) if unanswered else None
 
+def pick_next_question(session_data, answered=None):
+    # (category, question) to ask next, treating `answered` as already scored
+    for scores, questions in ((session_data["district_scores"], district_questions),
+                              (session_data["justice_scores"], justice_questions)):
+        next_cat = select_next_category(scores, answered)
+        if next_cat:
+            return next_cat, questions[next_cat]
+    return None
+
 # Translation
-def translate_to_english(text):
-    detected = translator.detect(text)
-    if detected.lang != 'en':
-        translated = translator.translate(text, src=detected.lang, dest='en')
-        return translated.text, detected.lang
+@metrics.timed("lawbot_translation_seconds", direction="to_english")
+def translate_to_english(text, lang=None):
+    # lang: already detected by the caller (detect once per answer, so detector stats count it once)
+    lang = lang or translator.detect(text)
+    if lang != 'en':
+        return pipeline.translate(text, lang, 'en'), lang
     return text, 'en'
 
-def translate_to_user_language(text, lang):
+@metrics.timed("lawbot_translation_seconds", direction="to_user")
+def translate_to_user_language(text, lang, pending=None):
+    # pending: a future from pipeline.submit() started earlier for the same text
     if lang != 'en':
-        translated = translator.translate(text, src='en', dest=lang)
-        return translated.text
+        return pipeline.result(pending or pipeline.submit(text, 'en', lang), fallback=text)
     return text
 
+# Questions are fixed strings: translate them up front for every language seen so far
+translator.set_warm_texts(list(district_questions.values()) + list(justice_questions.values()))
+translator.prewarm()
+
 # Routes
 @app.route("/")
 def index():
@@ -120,23 +142,30 @@ def index():
 @app.route("/start_chat", methods=["POST"])
 def start_chat():
     district = request.form.get("district")
+    if answers.too_long(district=district):
+        return jsonify({"error": "District name is too long."}), 400
     session_data = {
         "district": district,
         "district_scores": {k: None for k in district_questions.keys()},
         "justice_scores": {k: None for k in justice_questions.keys()},
         "chat_history": [],
         "user_lang": "en",
+        "session_key": answers.new_session_key(),
         "question_count": 0,
         "max_questions": 5
     }
-    return jsonify({"message": f"Hello! Let's start your feedback for {district}.", "session": session_data})
+    return jsonify({"message": f"Hello! Let's start your feedback for {district}.", **sessions.client_payload(session_store, session_data)})
 
 @app.route("/next_question", methods=["POST"])
 def next_question():
     data = request.json
-    session_data = data["session"]
+    session_data = sessions.load(session_store, data)
+    if session_data is None:
+        return jsonify({"error": "Session expired. Please start a new chat."}), 404
     last_answer = data.get("answer")
     last_category = data.get("category")
+    if answers.too_long(district=session_data.get("district"), category=last_category):
+        return jsonify({"error": "Category name is too long."}), 400
 
     response_templates = {
         "trust": ["Trust is {sentiment_word}.", "I see that trust is {sentiment_word}."],
@@ -158,14 +187,36 @@ def next_question():
 
     sentiment_to_word = {"positive": "good", "neutral": "okay", "negative": "poor"}
     bot_reply = ""
+    upcoming = prefetched = None
 
     if last_answer and last_category:
-        user_text, user_lang = translate_to_english(last_answer)
+        answer_lang = translator.detect(last_answer)
+        if pipeline.executor and session_data["question_count"] + 1 < session_data.get("max_questions", 5):
+            # Start translating the next question while the answer is translated and scored
+            upcoming = pick_next_question(session_data, answered=last_category)
+            if upcoming:
+                prefetched = pipeline.submit(upcoming[1], 'en', answer_lang)
+        user_text, user_lang = translate_to_english(last_answer, answer_lang)
         session_data["user_lang"] = user_lang
-        score = analyze_score(user_text, last_category)
-        sentiment = analyze_sentiment(user_text)
+
+        repeat = district_questions.get(last_category) or justice_questions.get(last_category)
+        fact = fact_index.answer(user_text, session_data["district"]) if repeat else None
+        if fact is not None:
+            # A factual question rather than an answer: reply, then ask the same question again
+            metrics.inc("lawbot_faq_answers_total")
+            return jsonify({
+                "bot_reply": translate_to_user_language(fact, user_lang),
+                "question": translate_to_user_language(repeat, user_lang),
+                "category": last_category,
+                **sessions.client_payload(session_store, session_data)
+            })
+
+        with metrics.timed("lawbot_score_seconds"):
+            score, _, sentiment = scoring.score_answer(user_text, last_category, keyword_index)
         session_data["chat_history"].append(
             {"category": last_category, "answer": last_answer, "score": score, "sentiment": sentiment})
+        answer_writer.submit((answers.session_key(session_data), "district_feedback", session_data["district"],
+                              last_category, last_answer, user_text, score, sentiment))
 
         if last_category in session_data["district_scores"]:
             session_data["district_scores"][last_category] = score
@@ -179,26 +230,10 @@ def next_question():
     max_questions = session_data.get("max_questions", 5)
 
     if session_data["question_count"] >= max_questions:
-        d_scores = [v for v in session_data["district_scores"].values() if v is not None]
-        j_scores = [v for v in session_data["justice_scores"].values() if v is not None]
-        sentiment_score = round(sum(d_scores)/len(d_scores), 2) if d_scores else 0
-        justice_score = round(sum(j_scores)/len(j_scores), 2) if j_scores else 0
-
-        justice_sentiment_counts = {"positive":0,"neutral":0,"negative":0}
-        for entry in session_data["chat_history"]:
-            if entry["category"] in session_data["justice_scores"]:
-                justice_sentiment_counts[entry["sentiment"]] += 1
-        justice_sentiment = max(justice_sentiment_counts, key=justice_sentiment_counts.get)
-        overall_score = round((sentiment_score + justice_score)/2, 2)
-
-        cursor.execute("""
-            INSERT INTO district_feedback (
-                district, trust_score, responsiveness_score, infrastructure_score,
-                public_services_score, safety_score, environment_score, transport_score,
-                community_score, economic_score, sentiment_score, justice_score,
-                justice_sentiment, overall_score
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (
+        sentiment_score, justice_score, justice_sentiment, overall_score = answers.district_summary(
+            session_data["district_scores"], session_data["justice_scores"], session_data["chat_history"])
+
+        feedback_writer.submit((
             session_data["district"],
             session_data["district_scores"]["trust"],
             session_data["district_scores"]["responsiveness"],
@@ -212,28 +247,34 @@ def next_question():
             sentiment_score,
             justice_score,
             justice_sentiment,
-            overall_score
+            overall_score,
+            answers.session_key(session_data)
         ))
-        conn.commit()
+        sessions.discard(session_store, session_data)
 
         return jsonify({"bot_reply": bot_reply, "message":"✅ Feedback session completed.", "done": True})
 
-    if None in session_data["district_scores"].values():
-        next_cat = select_next_category(session_data["district_scores"])
-        question = district_questions[next_cat]
-    elif None in session_data["justice_scores"].values():
-        next_cat = select_next_category(session_data["justice_scores"])
-        question = justice_questions[next_cat]
-    else:
+    if upcoming is None:
+        upcoming = pick_next_question(session_data)
+    if upcoming is None:
+        sessions.discard(session_store, session_data)
         return jsonify({"bot_reply": bot_reply, "message":"All questions answered.", "done": True})
+    next_cat, question = upcoming
 
-    question_translated = translate_to_user_language(question, session_data["user_lang"])
+    question_translated = translate_to_user_language(question, session_data["user_lang"], prefetched)
     return jsonify({
         "bot_reply": bot_reply,
         "question": question_translated,
         "category": next_cat,
-        "session": session_data
+        **sessions.client_payload(session_store, session_data)
     })
 
+# Pre-fork hook (prefork.py): load the polarity lexicon and translate the question
+# texts in the parent; keyword and FAQ indexes are already built at import
+def warmup():
+    scoring.polarity_of("warm up")
+    fact_index.answer("what is the helpline number?")
+    translator.prewarm(background=False)
+
 if __name__ == "__main__":
     app.run(debug=True)
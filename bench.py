@@ -0,0 +1,344 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import sqlite_standin
+
+# Benchmarks for the chat and dashboard apps, runnable without MySQL or googletrans.
+# The apps run against a SQLite stand-in (sqlite_standin.py) seeded with synthetic
+# data, with googletrans replaced by EchoTranslator. Each benchmark reports
+# throughput and p50 / p99 latency; results can be saved as a baseline and later
+# runs compared against it (exit status 1 when something got slower than the
+# tolerance, so it can gate a merge).
+#
+#   python bench.py seed --districts 30 --rows 5000     (re)build bench.sqlite3
+#   python bench.py run                                 micro + macro benchmarks
+#   python bench.py run --only micro --save-baseline    store results in bench_baseline.json
+#   python bench.py run --tolerance 0.25                compare with bench_baseline.json
+#   python bench.py run --only gateway                  translation gateway vs a degraded backend
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(HERE, "bench.sqlite3")
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+
+DISTRICTS = ["Ariyalur", "Chengalpattu", "Chennai", "Coimbatore", "Cuddalore", "Dharmapuri", "Dindigul", "Erode",
+             "Kallakurichi", "Kancheepuram", "Kanniyakumari", "Karur", "Krishnagiri", "Madurai", "Mayiladuthurai",
+             "Nagapattinam", "Namakkal", "Perambalur", "Pudukkottai", "Ramanathapuram", "Ranipet", "Salem",
+             "Sivaganga", "Tenkasi", "Thanjavur", "The Nilgiris", "Theni", "Thoothukkudi", "Tiruchirappalli",
+             "Tirunelveli", "Tirupathur", "Tiruppur", "Tiruvallur", "Tiruvannamalai", "Tiruvarur", "Vellore",
+             "Viluppuram", "Virudhunagar"]
+
+ANSWER_PHRASES = ["the police were very helpful and honest", "roads are bad and buses are always late",
+                  "I trust the local administration", "corruption is everywhere, you need to pay a bribe",
+                  "services are quick and responsive", "nothing works here", "it is okay", "good",
+                  "the court takes years to resolve a simple case", "legal aid is easy to access and free",
+                  "hospitals and schools are clean", "not enough jobs or business opportunities",
+                  "the community participates in local decisions", "we feel safe at night",
+                  "officials are unfair and biased", "pollution from factories is terrible"]
+SUGGESTION_WORDS = ("faster courts more legal aid camps fair police transparent process online complaints "
+                    "free lawyers awareness rights women safety village courts reduce corruption bribe "
+                    "digital records timely hearing community mediation helpline support").split()
+
+
+# ------------------ Stand-ins ------------------
+class EchoTranslator:
+    # googletrans.Translator stand-in: everything is English and comes back unchanged.
+    # latency and error_rate (share of calls that raise) simulate a degraded backend.
+    def __init__(self, latency=0.0, error_rate=0.0, random_seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(random_seed)
+
+    def _backend(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise ConnectionError("injected translation failure")
+
+    def detect(self, text):
+        self._backend()
+        return types.SimpleNamespace(lang="en", confidence=1.0)
+
+    def translate(self, text, src="auto", dest="en"):
+        self._backend()
+        return types.SimpleNamespace(text=text, src=src, dest=dest)
+
+
+def setup(path=DB_PATH, translate_latency=0.0, translate_error_rate=0.0):
+    # Must run before any app module is imported
+    db.set_pool(sqlite_standin.StandinPool(path))
+    try:
+        import googletrans
+    except ImportError:
+        googletrans = sys.modules["googletrans"] = types.ModuleType("googletrans")
+    googletrans.Translator = lambda: EchoTranslator(translate_latency, translate_error_rate)
+    # Spool files, chart cache and profiles go to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="lawbot-bench-"))
+
+
+# ------------------ Synthetic data ------------------
+def district_names(n):
+    return [DISTRICTS[i] if i < len(DISTRICTS) else f"{DISTRICTS[i % len(DISTRICTS)]} {i // len(DISTRICTS)}"
+            for i in range(n)]
+
+def _score(rng):
+    return rng.choice((1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0))
+
+def _timestamp(rng, now):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now - rng.random() * 365 * 86400))
+
+def seed(path=DB_PATH, districts=30, rows=5000, random_seed=1):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    setup(path)
+    import answers, app, project, rollups, term_index  # creating the apps creates their tables
+
+    rng = random.Random(random_seed)
+    names = district_names(districts)
+    now = time.time()
+    justice, district, answer_rows = [], [], []
+    for i in range(rows):
+        key = f"{i:032x}"
+        name = rng.choice(names)
+        scores = [_score(rng) for _ in range(6)]
+        suggestions = " ".join(rng.choice(SUGGESTION_WORDS) for _ in range(rng.randint(4, 12)))
+        justice.append((name, *scores, suggestions, "N/A", round(sum(scores) / 6, 2), key, _timestamp(rng, now)))
+        for category, score in zip(answers.JUSTICE_SCORE_CATEGORIES, scores):
+            phrase = rng.choice(ANSWER_PHRASES)
+            answer_rows.append((key, "justice_feedback", name, category, phrase, phrase, score, "neutral"))
+
+        dkey = f"d{i:031x}"
+        d_scores = [_score(rng) if rng.random() < 0.5 else None for _ in answers.DISTRICT_SCORE_CATEGORIES]
+        summary = (_score(rng), _score(rng), rng.choice(("positive", "neutral", "negative")), _score(rng))
+        district.append((name, *d_scores, *summary, dkey))
+
+    with db.cursor(commit=True) as cur:
+        cur.executemany("INSERT INTO justice_feedback (district, trust_score, responsiveness_score, fairness_score, "
+                        "accessibility_score, corruption_score, community_justice_score, suggestions, "
+                        "justice_sentiment, overall_score, session_key, created_at) "
+                        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)", justice)
+        columns = ", ".join(f"{c}_score" for c in answers.DISTRICT_SCORE_CATEGORIES)
+        cur.executemany(f"INSERT INTO district_feedback (district, {columns}, sentiment_score, justice_score, "
+                        f"justice_sentiment, overall_score, session_key) VALUES ({', '.join(['%s'] * 15)})", district)
+        cur.executemany(answers.INSERT_ANSWER, answer_rows)
+        cur.execute("CREATE TABLE IF NOT EXISTS district_counts (district VARCHAR(255) PRIMARY KEY, value DOUBLE)")
+        cur.executemany("INSERT INTO district_counts (district, value) VALUES (%s, %s)",
+                        [(name, rng.randint(0, 500)) for name in names])
+    rollups.rebuild()
+    term_index.rebuild()
+    return {"districts": districts, "justice_feedback": rows, "district_feedback": rows,
+            "feedback_answers": len(answer_rows)}
+
+
+# ------------------ Measurement ------------------
+def summarize(timings):
+    ordered = sorted(timings)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    total = sum(ordered)
+    return {"n": len(ordered), "ops": len(ordered) / total if total else 0.0,
+            "p50_ms": pct(0.50), "p99_ms": pct(0.99)}
+
+def measure(fn, n, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def micro_benchmarks(scale=1.0):
+    import app, powerbiapp, term_index
+    rng = random.Random(2)
+    categories = list(app.keywords_dict)
+    def sample():
+        return rng.choice(ANSWER_PHRASES), rng.choice(categories)
+    frequencies = dict(term_index.top_terms(None, 200))
+    return {
+        "keyword_score": measure(lambda: app.keyword_score(*sample()), int(20000 * scale)),
+        "analyze_score": measure(lambda: app.analyze_score(*sample()), int(5000 * scale)),
+        "analyze_sentiment": measure(lambda: app.analyze_sentiment(sample()[0]), int(5000 * scale)),
+        "create_wordcloud": measure(lambda: powerbiapp.create_wordcloud(frequencies), max(3, int(10 * scale))),
+    }
+
+
+def _chat_session(client, rng, first_question):
+    # One full session through the Flask test client; returns per-request timings
+    timings = []
+    def post(path, **kwargs):
+        start = time.perf_counter()
+        response = client.post(path, **kwargs)
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()
+
+    reply = post("/start_chat", data={"district": rng.choice(DISTRICTS)})
+    session = {k: reply[k] for k in ("session", "session_id") if k in reply}
+    category = reply.get("category") if first_question else None
+    answer = rng.choice(ANSWER_PHRASES) if category else None
+    for _ in range(50):
+        reply = post("/next_question", json={**session, "answer": answer, "category": category})
+        if reply.get("done"):
+            break
+        session = {k: reply[k] for k in ("session", "session_id") if k in reply}
+        category, answer = reply["category"], rng.choice(ANSWER_PHRASES)
+    return timings
+
+def macro_benchmarks(scale=1.0):
+    import app, feedback_snapshot, load_data, powerbiapp, project, term_index
+    rng = random.Random(3)
+    results = {}
+    for name, module, first_question in (("district_chat", app, False), ("justice_chat", project, True)):
+        client = module.app.test_client()
+        sessions, requests = [], []
+        for _ in range(max(5, int(50 * scale))):
+            timings = _chat_session(client, rng, first_question)
+            sessions.append(sum(timings))
+            requests.extend(timings)
+        results[f"{name}_session"] = summarize(sessions)
+        results[f"{name}_request"] = summarize(requests)
+
+    districts = list(powerbiapp.feedback_queries.district_names()) or [None]
+    def build(district=None):
+        powerbiapp.build_dashboard(powerbiapp.fetch_feedback(district), district)
+    results["dashboard_build_all"] = measure(build, max(2, int(5 * scale)))
+    results["dashboard_build_district"] = measure(lambda: build(rng.choice(districts)), max(3, int(10 * scale)))
+    powerbiapp.dashboard_fragments(None)
+    results["dashboard_cached"] = measure(lambda: powerbiapp.dashboard_fragments(None), int(200 * scale))
+
+    # Per-row dashboard read: MySQL (here SQLite) vs the memory-mapped snapshot
+    columns = powerbiapp.DASHBOARD_COLUMNS
+    results["feedback_read_sql"] = measure(lambda: powerbiapp.feedback_queries.fetch_feedback(columns),
+                                           max(3, int(10 * scale)))
+    feedback_snapshot.sync("justice_feedback")
+    results["feedback_read_snapshot"] = measure(lambda: feedback_snapshot.read("justice_feedback", columns),
+                                                max(3, int(10 * scale)))
+    results["snapshot_sync_noop"] = measure(lambda: feedback_snapshot.sync("justice_feedback"), int(50 * scale))
+
+    client = powerbiapp.app.test_client()
+    results["api_top_terms"] = measure(lambda: client.get("/api/top_terms?n=50"), int(200 * scale))
+    client = load_data.app.test_client()
+    results["get_counts"] = measure(lambda: client.get("/counts"), int(500 * scale))
+    results["get_counts_refresh"] = measure(load_data.snapshot.refresh, int(100 * scale))
+    return results
+
+
+# Backend behaviours for the gateway benchmarks (EchoTranslator arguments)
+GATEWAY_SCENARIOS = {"healthy": {"latency": 0.02}, "flaky": {"latency": 0.02, "error_rate": 0.5},
+                     "hung": {"latency": 2.0}, "down": {"error_rate": 1.0}}
+
+def gateway_benchmarks(scale=1.0, concurrency=16, deadline=0.5):
+    # Caller-side latency of one translation through TranslationGateway, 16 callers at a
+    # time, while the backend is healthy / flaky / hung / down. The p99 should stay
+    # under the deadline whatever the backend does (failures fall back to the original text).
+    import translation
+    results = {}
+    for name, faults in GATEWAY_SCENARIOS.items():
+        gateway = translation.TranslationGateway(EchoTranslator(**faults, random_seed=4), deadline=deadline, cooldown=0.5)
+        def call(_):
+            start = time.perf_counter()
+            try:
+                gateway.translate("vanakkam", src="ta", dest="en")
+            except translation.TranslationUnavailable:
+                pass
+            return time.perf_counter() - start
+        with ThreadPoolExecutor(concurrency) as pool:
+            results[f"gateway_{name}"] = summarize(list(pool.map(call, range(max(50, int(400 * scale))))))
+        gateway._executor.shutdown(wait=False)
+    return results
+
+
+# ------------------ Reporting ------------------
+def compare(results, baseline, tolerance):
+    # Names whose p50 or p99 grew by more than tolerance (a fraction) over the baseline
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if before[key] and (result[key] - before[key]) / before[key] > tolerance:
+                regressions.append(name)
+                break
+    return regressions
+
+def _change(now, before):
+    return f"{(now - before) / before * 100:+.0f}%" if before else "n/a"
+
+def print_report(results, baseline=None, regressions=()):
+    header = f"{'benchmark':28} {'n':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}"
+    print(header + ("   Δp50   Δp99" if baseline else ""))
+    for name, r in results.items():
+        line = f"{name:28} {r['n']:>6} {r['ops']:>10.1f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}"
+        before = (baseline or {}).get(name)
+        if before:
+            line += f" {_change(r['p50_ms'], before['p50_ms']):>6} {_change(r['p99_ms'], before['p99_ms']):>6}"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the chat and dashboard apps against a SQLite stand-in")
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed_cmd = commands.add_parser("seed", help="build the stand-in database with synthetic data")
+    seed_cmd.add_argument("--districts", type=int, default=30)
+    seed_cmd.add_argument("--rows", type=int, default=5000)
+    seed_cmd.add_argument("--db", default=DB_PATH)
+    run_cmd = commands.add_parser("run", help="run the benchmarks")
+    run_cmd.add_argument("--only", choices=("micro", "macro", "gateway"))
+    run_cmd.add_argument("--scale", type=float, default=1.0, help="multiply the iteration counts")
+    run_cmd.add_argument("--translate-latency", type=float, default=0.0, help="seconds per fake googletrans call")
+    run_cmd.add_argument("--translate-error-rate", type=float, default=0.0, help="share of fake googletrans calls that fail")
+    run_cmd.add_argument("--db", default=DB_PATH)
+    run_cmd.add_argument("--baseline", default=BASELINE_PATH)
+    run_cmd.add_argument("--save-baseline", action="store_true")
+    run_cmd.add_argument("--tolerance", type=float, default=0.25)
+    run_cmd.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args()
+    args.db = os.path.abspath(args.db)
+    output = os.path.abspath(args.output) if getattr(args, "output", None) else None
+
+    if args.command == "seed":
+        print(seed(args.db, args.districts, args.rows))
+        sys.exit(0)
+
+    if not os.path.exists(args.db):
+        print(f"Seeding {args.db}: {seed(args.db)}")
+    baseline_path = os.path.abspath(args.baseline)
+    setup(args.db, args.translate_latency, args.translate_error_rate)
+    results = {}
+    if args.only in (None, "micro"):
+        results.update(micro_benchmarks(args.scale))
+    if args.only in (None, "macro"):
+        results.update(macro_benchmarks(args.scale))
+    if args.only in (None, "gateway"):
+        results.update(gateway_benchmarks(args.scale))
+
+    baseline = None
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    print_report(results, baseline, regressions)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import prefork
+
+# Rendered dashboard fragments (Plotly figure JSON, base64 PNGs, KPI values) cached by
+# (district filter, data version) for powerbiapp.py. The data version is a
+# watermark on justice_feedback, so cached pages stay valid until the next
+# feedback insert. Entries live in memory and, if a directory is given, on disk
+# so a restarted worker does not have to re-render.
+
+
+class FragmentCache:
+    def __init__(self, directory=None, max_entries=256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (version, fragments)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        entry = self._load(key)
+        if entry is not None and entry[0] == version:
+            self._remember(key, entry)
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, version, fragments):
+        self._remember(key, (version, fragments))
+        self._store(key, version, fragments)
+
+    def stale_keys(self, version):
+        with self._lock:
+            return [key for key, (v, _) in self._entries.items() if v != version]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ---- disk ----
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+            return data["version"], data["fragments"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, key, version, fragments):
+        if not self.directory:
+            return
+        tmp = self._path(key) + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "fragments": fragments}, f)
+            os.replace(tmp, self._path(key))
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+def start_refresher(cache, version_fn, render_fn, interval):
+    # Re-render fragments whose data changed, so the next request finds them warm
+    def run(stop):
+        while not stop.wait(interval):
+            try:
+                version = version_fn()
+                for key in cache.stale_keys(version):
+                    cache.put(key, version, render_fn(key))
+            except Exception:
+                continue
+
+    return prefork.start_thread(run, "chart-refresher")
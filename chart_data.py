@@ -0,0 +1,64 @@
+import os
+
+import lazy_imports
+
+np = lazy_imports.lazy("numpy")
+pd = lazy_imports.lazy("pandas")
+
+# Fixed-size inputs for the charts that would otherwise draw one mark per
+# feedback row (powerbiapp.py: Sentiment vs Trust scatter, Justice Index bar).
+# Up to LAWBOT_RAW_MARKS_MAX rows the raw marks are plotted; past it the rows are
+# reduced with NumPy to a density grid / per-district summary, so the figure
+# size stays the same however much feedback has accumulated.
+
+RAW_MARKS_MAX = int(os.environ.get("LAWBOT_RAW_MARKS_MAX", "5000"))
+GRID_BINS = int(os.environ.get("LAWBOT_DENSITY_BINS", "40"))
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def use_raw(n_rows):
+    return n_rows <= RAW_MARKS_MAX
+
+def density_grid(x, y, bins=GRID_BINS):
+    # Counts of (x, y) pairs on a bins x bins grid -> (x centres, y centres, z[y][x]);
+    # empty cells are NaN so they are left blank rather than drawn as zero
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    if not keep.any():
+        return np.array([]), np.array([]), np.zeros((0, 0))
+    counts, x_edges, y_edges = np.histogram2d(x[keep], y[keep], bins=bins)
+    counts[counts == 0] = np.nan
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+def group_means(keys, x, y):
+    # Per-key mean of x and y -> (keys, counts, x means, y means)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keys = np.asarray(keys, dtype=object)
+    keep = ~(np.isnan(x) | np.isnan(y)) & pd.notna(keys)  # a blank district may be None or NaN
+    names, codes = np.unique(keys[keep].astype(str), return_inverse=True)
+    counts = np.bincount(codes, minlength=len(names))
+    return (names, counts, np.bincount(codes, x[keep], len(names)) / counts,
+            np.bincount(codes, y[keep], len(names)) / counts)
+
+def group_summary(keys, values, quantiles=QUANTILES):
+    # Per-key count, mean and (linearly interpolated) quantiles of values
+    values = np.asarray(values, dtype=float)
+    keys = np.asarray(keys, dtype=object)
+    keep = ~np.isnan(values) & pd.notna(keys)
+    names, codes = np.unique(keys[keep].astype(str), return_inverse=True)
+    values = values[keep]
+    order = np.lexsort((values, codes))  # by key, then value: each group is a sorted run
+    values, codes = values[order], codes[order]
+    counts = np.bincount(codes, minlength=len(names))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(int)
+    means = np.bincount(codes, values, len(names)) / np.maximum(counts, 1)
+    summary = {"district": names, "count": counts, "mean": means}
+    for q in quantiles:
+        position = q * (counts - 1)
+        low = np.floor(position).astype(int)
+        high = np.minimum(low + 1, counts - 1)
+        fraction = position - low
+        summary[q] = values[starts + low] * (1 - fraction) + values[starts + high] * fraction
+    return summary
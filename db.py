@@ -0,0 +1,221 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+import prefork
+
+# Shared MySQL access for app.py, project.py, powerbiapp.py and load_data.py.
+# A fixed-size pool hands out one connection per request (with db.connection()
+# or db.cursor()), so threaded servers never share cursor state and dashboard
+# hits don't pay connection setup. Connections are opened lazily on first use.
+
+DB_CONFIG = {
+    "host": os.environ.get("LAWBOT_DB_HOST", "localhost"),
+    "user": os.environ.get("LAWBOT_DB_USER", "root"),
+    "password": os.environ.get("LAWBOT_DB_PASSWORD", ""),
+    "database": os.environ.get("LAWBOT_DB_NAME", "chatbot_db"),
+}
+POOL_SIZE = int(os.environ.get("LAWBOT_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("LAWBOT_DB_POOL_TIMEOUT", "10"))
+# Connections idle longer than this are pinged (and reopened if dead) before reuse
+STALE_AFTER = float(os.environ.get("LAWBOT_DB_STALE_AFTER", "30"))
+
+
+class PoolTimeout(mysql.connector.Error):
+    pass
+
+# Lost / refused connections, an exhausted pool, deadlocks and lock wait timeouts are
+# worth retrying; anything else (too-long values, bad SQL) fails the same way every time
+RETRY_ERRNOS = (1205, 1213)
+
+def is_transient(err):
+    return (isinstance(err, (mysql.connector.OperationalError, mysql.connector.InterfaceError, PoolTimeout))
+            or getattr(err, "errno", None) in RETRY_ERRNOS)
+
+
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, stale_after=STALE_AFTER, **config):
+        self.size = size
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.config = config or dict(DB_CONFIG)
+        # Each slot is (connection or None, last returned at); None means "open on checkout"
+        self._slots = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put((None, 0.0))
+        self._lock = threading.Lock()
+        self._stats = {"checkouts": 0, "checked_out": 0, "wait_total": 0.0, "wait_max": 0.0,
+                       "timeouts": 0, "created": 0, "reconnects": 0}
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        try:
+            conn, returned_at = self._slots.get(timeout=self.timeout)
+        except queue.Empty:
+            self._bump("timeouts")
+            raise PoolTimeout(msg=f"No database connection free after {self.timeout}s")
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checked_out"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+        try:
+            conn = self._ready(conn, returned_at)
+            yield conn
+        finally:
+            # End whatever transaction the caller left open (committed work is unaffected),
+            # so the next checkout reads a fresh InnoDB snapshot rather than this one. A
+            # stream stopped early still has rows on the wire; rolling back would read
+            # them all, so that connection is dropped instead
+            healthy = not getattr(conn, "unread_result", False) and self._rollback(conn)
+            with self._lock:
+                self._stats["checked_out"] -= 1
+            if not healthy and conn is not None:
+                self._close(conn)
+                conn = None
+            self._slots.put((conn, time.monotonic()))
+
+    def _ready(self, conn, returned_at):
+        if conn is None:
+            self._bump("created")
+            return mysql.connector.connect(**self.config)
+        if time.monotonic() - returned_at > self.stale_after:
+            try:
+                conn.ping(reconnect=True, attempts=1, delay=0)
+                return conn
+            except mysql.connector.Error:
+                self._close(conn)
+                self._bump("reconnects")
+                return mysql.connector.connect(**self.config)
+        return conn
+
+    def _rollback(self, conn):
+        if conn is None:
+            return True
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            if getattr(conn, "unread_result", False):
+                conn.shutdown()  # close the socket without reading the rest or sending QUIT
+            else:
+                conn.close()
+        except Exception:
+            pass
+
+    def _bump(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["idle"] = self._slots.qsize()
+        stats["wait_avg"] = stats["wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close_all(self):
+        # Closes idle connections; ones checked out are closed when they come back unhealthy
+        drained = []
+        while True:
+            try:
+                drained.append(self._slots.get_nowait())
+            except queue.Empty:
+                break
+        for conn, _ in drained:
+            if conn is not None:
+                self._close(conn)
+            self._slots.put((None, 0.0))
+
+
+# ------------------ Module-level pool ------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def reset_pool():
+    # Drop the current pool without touching its sockets (e.g. in a freshly forked child)
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+def set_pool(pool):
+    # Use another pool with the same interface (e.g. sqlite_standin.StandinPool for benchmarks)
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+def _close_before_fork():
+    # prefork.py: the parent closes its connections so no socket is shared with the
+    # workers; each worker opens its own on first use
+    if _pool is not None:
+        _pool.close_all()
+
+prefork.register(before=_close_before_fork)
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+@contextmanager
+def cursor(dictionary=False, commit=False):
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            yield cur
+            if commit:
+                conn.commit()
+        finally:
+            cur.close()
+
+def execute(sql, params=None):
+    with cursor(commit=True) as cur:
+        cur.execute(sql, params)
+        return cur.lastrowid
+
+def fetchall(sql, params=None, dictionary=False):
+    with cursor(dictionary=dictionary) as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+def stream(sql, params=None, chunk_size=5000, dictionary=False):
+    # Yields lists of up to chunk_size rows from an unbuffered (server-side) cursor,
+    # so arbitrarily large results are read in constant memory. The connection is
+    # held until the generator is exhausted or closed: use a separate db.cursor()
+    # for writes while iterating. Closing it early (an export client went away)
+    # drops the connection rather than reading the rest of the result.
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary, buffered=False)
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            if not conn.unread_result:
+                cur.close()  # closing a cursor with rows pending would read them
+
+def stats():
+    return get_pool().stats()
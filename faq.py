@@ -0,0 +1,164 @@
+import csv
+import glob
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# Factual question answering for the chat apps, over curated Question/Answer CSVs
+# (krishnagiri_facts.csv, or one <district>_facts.csv per district).
+# Questions are indexed as L2-normalized TF-IDF rows; a lookup is one sparse-ish
+# dot product, well under a millisecond for a few thousand facts. Files are
+# re-read automatically when they change on disk.
+#
+# Only a single question-shaped sentence is looked up, only against facts for
+# the chat's district (plus facts without one), and the best match must share
+# MIN_MATCHED_TERMS content words with it (fewer only if the question is shorter),
+# so a survey answer that happens to mention "collector" is still scored.
+
+FACTS_PATH = os.environ.get("LAWBOT_FACTS_PATH", os.path.dirname(os.path.abspath(__file__)))
+MIN_SCORE = 0.5
+MIN_MATCHED_TERMS = 2
+RELOAD_CHECK_INTERVAL = 5.0
+
+log = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("a an and are as at be by do does for from in is it of on or the there this to was what "
+                      "which who whom how many much some me tell name".split())
+QUESTION_WORDS = ("what", "who", "which", "where", "when", "how", "name", "is", "are", "tell")
+SENTENCE_RE = re.compile(r"[^.!?]+[.!?]*")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def looks_like_question(text):
+    # One sentence, asked as a question ("How much do you trust? I trust the collector" is an answer)
+    sentences = [s.strip() for s in SENTENCE_RE.findall(text.strip().lower()) if s.strip(" .!?")]
+    if len(sentences) != 1:
+        return False
+    return sentences[0].endswith("?") or sentences[0].split(" ", 1)[0] in QUESTION_WORDS
+
+def district_key(name):
+    return " ".join((name or "").replace("_", " ").lower().split())
+
+
+class FactIndex:
+    def __init__(self, path=FACTS_PATH, min_score=MIN_SCORE):
+        self.path = path
+        self.min_score = min_score
+        self.facts = []
+        self._vocab = {}
+        self._idf = None
+        self._matrix = None
+        self._districts = None
+        self._mtimes = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    # ------------------ Loading ------------------
+    def files(self):
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, "*_facts.csv")))
+        return [self.path] if os.path.exists(self.path) else []
+
+    def reload(self):
+        files = self.files()
+        facts = []
+        for path in files:
+            district = os.path.basename(path)[:-len("_facts.csv")].replace("_", " ").title() \
+                if path.endswith("_facts.csv") else None
+            with open(path, encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    if row.get("Question") and row.get("Answer"):
+                        facts.append(dict(row, district=district))
+
+        vocab, doc_freq, rows = {}, {}, []
+        for fact in facts:
+            counts = {}
+            for token in tokenize(fact["Question"]):
+                counts[token] = counts.get(token, 0) + 1
+            rows.append(counts)
+            for token in counts:
+                vocab.setdefault(token, len(vocab))
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+
+        idf = np.zeros(len(vocab), dtype=np.float32)
+        for token, i in vocab.items():
+            idf[i] = math.log((1 + len(facts)) / (1 + doc_freq[token])) + 1
+        matrix = np.zeros((len(facts), len(vocab)), dtype=np.float32)
+        for r, counts in enumerate(rows):
+            for token, n in counts.items():
+                matrix[r, vocab[token]] = n * idf[vocab[token]]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        districts = np.array([district_key(fact["district"]) for fact in facts], dtype=object)
+        mtimes = {path: os.path.getmtime(path) for path in files}
+        with self._lock:
+            self.facts, self._vocab, self._idf, self._matrix = facts, vocab, idf, matrix
+            self._districts = districts
+            self._mtimes = mtimes
+            self._checked = time.monotonic()
+
+    def reload_if_changed(self):
+        if time.monotonic() - self._checked < RELOAD_CHECK_INTERVAL:
+            return False
+        self._checked = time.monotonic()
+        files = self.files()
+        try:
+            current = {path: os.path.getmtime(path) for path in files}
+        except OSError:
+            return False
+        if current == self._mtimes:
+            return False
+        try:
+            self.reload()
+        except (OSError, csv.Error, ValueError) as err:
+            # Removed, renamed or half-written CSV: keep answering from the previous index and
+            # try again when the files change next
+            log.warning("Keeping the previous FAQ index; reloading %s failed: %s", self.path, err)
+            self._mtimes = current
+            return False
+        return True
+
+    # ------------------ Lookup ------------------
+    def match(self, question, district=None):
+        # Best fact (for district, if given), its cosine similarity and the number of
+        # question terms it shares, or (None, 0.0, 0)
+        self.reload_if_changed()
+        with self._lock:
+            facts, vocab, idf, matrix, districts = self.facts, self._vocab, self._idf, self._matrix, self._districts
+        if not facts:
+            return None, 0.0, 0
+        query = np.zeros(len(vocab), dtype=np.float32)
+        for token in tokenize(question):
+            i = vocab.get(token)
+            if i is not None:
+                query[i] += idf[i]
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None, 0.0, 0
+        scores = matrix @ (query / norm)
+        if district is not None:
+            scores[(districts != district_key(district)) & (districts != "")] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            return None, 0.0, 0
+        return facts[best], float(scores[best]), int(np.count_nonzero(matrix[best] * query))
+
+    def answer(self, question, district=None):
+        # Answer text when the match is confident enough, else None (use the normal flow)
+        if not looks_like_question(question):
+            return None
+        fact, score, matched = self.match(question, district)
+        needed = min(MIN_MATCHED_TERMS, len(set(tokenize(question))))
+        if fact is None or score < self.min_score or matched < needed:
+            return None
+        return fact["Answer"]
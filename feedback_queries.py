@@ -0,0 +1,101 @@
+import threading
+import time
+
+import db
+import lazy_imports
+
+pd = lazy_imports.lazy("pandas")  # only fetch_feedback needs it
+
+# Read queries over justice_feedback for powerbiapp.py.
+# Filters are pushed into SQL as parameters and only the requested columns are
+# selected, so a single-district page reads that district's rows through the
+# (district, created_at) index instead of the whole table.
+
+FEEDBACK_COLUMNS = ["id", "district", "trust_score", "responsiveness_score", "fairness_score",
+                    "accessibility_score", "corruption_score", "community_justice_score",
+                    "suggestions", "justice_sentiment", "overall_score", "created_at"]
+
+DISTRICT_CACHE_TTL = 60
+
+
+# ------------------ Schema ------------------
+# Shared by project.py (which writes the table) and powerbiapp.py (which may start first)
+JUSTICE_FEEDBACK_DDL = """
+CREATE TABLE IF NOT EXISTS justice_feedback (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    district VARCHAR(255),
+    trust_score FLOAT,
+    responsiveness_score FLOAT,
+    fairness_score FLOAT,
+    accessibility_score FLOAT,
+    corruption_score FLOAT,
+    community_justice_score FLOAT,
+    suggestions TEXT,
+    justice_sentiment VARCHAR(50),
+    overall_score FLOAT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    session_key CHAR(32),
+    INDEX idx_district_created (district, created_at),
+    INDEX idx_session_key (session_key)
+)
+"""
+
+def ensure_indexes():
+    # The table if nothing has created it yet, plus what tables from before these columns lack
+    with db.cursor(commit=True) as cur:
+        cur.execute(JUSTICE_FEEDBACK_DDL)
+        cur.execute("SHOW COLUMNS FROM justice_feedback LIKE 'created_at'")
+        if not cur.fetchall():
+            cur.execute("ALTER TABLE justice_feedback ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+        cur.execute("SHOW INDEX FROM justice_feedback WHERE Key_name = 'idx_district_created'")
+        if not cur.fetchall():
+            cur.execute("CREATE INDEX idx_district_created ON justice_feedback (district, created_at)")
+
+
+# ------------------ Queries ------------------
+def feedback_query(columns=None, district=None, start=None, end=None):
+    columns = columns or FEEDBACK_COLUMNS
+    unknown = set(columns) - set(FEEDBACK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown justice_feedback columns: {sorted(unknown)}")
+    where, params = [], []
+    if district is not None:
+        where.append("district = %s")
+        params.append(district)
+    if start is not None:
+        where.append("created_at >= %s")
+        params.append(start)
+    if end is not None:
+        where.append("created_at < %s")
+        params.append(end)
+    sql = f"SELECT {', '.join(columns)} FROM justice_feedback"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, tuple(params)
+
+def fetch_feedback(columns=None, district=None, start=None, end=None):
+    sql, params = feedback_query(columns, district, start, end)
+    with db.connection() as conn:
+        return pd.read_sql(sql, conn, params=params or None)
+
+
+_districts = {"names": None, "expires": 0.0}
+_districts_lock = threading.Lock()
+
+def district_names(refresh=False):
+    # Dropdown list; served from the index and cached for DISTRICT_CACHE_TTL seconds
+    with _districts_lock:
+        if refresh or _districts["names"] is None or time.monotonic() > _districts["expires"]:
+            rows = db.fetchall("SELECT DISTINCT district FROM justice_feedback WHERE district IS NOT NULL ORDER BY district")
+            _districts["names"] = [row[0] for row in rows]
+            _districts["expires"] = time.monotonic() + DISTRICT_CACHE_TTL
+        return list(_districts["names"])
+
+
+def data_version():
+    # Cheap change watermark: newest id plus the rollup row count (catches deletes too)
+    # and the rollup revision (catches rows rewritten by rescore.py)
+    row = db.fetchall("SELECT (SELECT COALESCE(MAX(id), 0) FROM justice_feedback), "
+                      "(SELECT COALESCE(SUM(feedback_count), 0) FROM justice_district_stats), "
+                      "(SELECT COALESCE(MAX(revision), 0) FROM justice_stats_revision)")[0]
+    return f"{int(row[0])}-{int(row[1])}-{int(row[2])}"
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import answers
+import db
+import lazy_imports
+import prefork
+
+try:
+    import fcntl
+except ImportError:  # Windows: run a single exporter
+    fcntl = None
+
+np = lazy_imports.lazy("numpy")
+pd = lazy_imports.lazy("pandas")
+
+# Local columnar copy of justice_feedback / district_feedback for analytics reads.
+# Each build of a table is a directory <table>.<n> with one raw little-endian file
+# per column plus a manifest.json holding the row count, id watermark and category
+# labels; the file <table>.current names the live build and is swapped atomically
+# when a rebuild finishes. New rows are appended by id; readers memory-map just the
+# columns they ask for, so the dashboard reads without going through MySQL or
+# building Python rows.
+#
+#   python feedback_snapshot.py                 append new rows of both tables
+#   python feedback_snapshot.py --rebuild       rewrite from scratch
+#   python feedback_snapshot.py --watch 30      keep appending every 30 seconds
+#
+# Deleted rows are noticed (row count below the watermark changes, checked every
+# VERIFY_INTERVAL seconds) and trigger a rebuild; rescore.py invalidates the
+# snapshot of a table whose rows it updates. A snapshot not synced for MAX_AGE
+# seconds is ignored, so reads go back to MySQL when nothing keeps it current.
+
+SNAPSHOT_DIR = os.environ.get("LAWBOT_SNAPSHOT_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot"))
+MAX_AGE = float(os.environ.get("LAWBOT_SNAPSHOT_MAX_AGE", "300"))
+VERIFY_INTERVAL = float(os.environ.get("LAWBOT_SNAPSHOT_VERIFY_INTERVAL", "3600"))
+CHUNK_SIZE = 50000
+
+# column -> stored dtype; category columns are int16 codes into the manifest's labels
+# (-1 = NULL), int8 scores use -1 for NULL and are read back as pandas Int8
+TABLES = {
+    "justice_feedback": {"district": "category",
+                         **{f"{c}_score": "float32" for c in answers.JUSTICE_SCORE_CATEGORIES},
+                         "justice_sentiment": "category", "overall_score": "float32",
+                         "created_at": "datetime64[s]"},
+    "district_feedback": {"district": "category",
+                          **{f"{c}_score": "int8" for c in answers.DISTRICT_SCORE_CATEGORIES},
+                          "sentiment_score": "int8", "justice_score": "int8",
+                          "justice_sentiment": "category", "overall_score": "float32"},
+}
+STORAGE = {"category": "<i2", "int8": "i1", "float32": "<f4", "datetime64[s]": "<M8[s]", "int64": "<i8"}
+
+
+# ------------------ Manifest ------------------
+def _pointer(table, directory):
+    return os.path.join(directory, table + ".current")
+
+def table_dir(table, directory=SNAPSHOT_DIR):
+    # Directory of the live build, None before the first one
+    try:
+        with open(_pointer(table, directory), encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(directory, name) if name else None
+
+def _load(path):
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_manifest(table, directory=SNAPSHOT_DIR):
+    return _load(table_dir(table, directory))
+
+def _save_manifest(path, manifest):
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+
+def _fresh(manifest, max_age=MAX_AGE):
+    if manifest is None or time.time() - manifest.get("synced_at", 0) > max_age:
+        return None
+    return manifest
+
+def fresh_manifest(table, directory=SNAPSHOT_DIR, max_age=MAX_AGE):
+    # The manifest if the snapshot was synced within max_age seconds, else None
+    return _fresh(load_manifest(table, directory), max_age)
+
+def version(table, directory=SNAPSHOT_DIR):
+    manifest = fresh_manifest(table, directory)
+    return None if manifest is None else f"{manifest['rows']}-{manifest['last_id']}"
+
+@contextmanager
+def _writer_lock(directory):
+    # One exporter at a time, even with several dashboard workers refreshing
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def invalidate(table, directory=SNAPSHOT_DIR):
+    # Readers fall back to MySQL until the next sync rebuilds the table
+    with _writer_lock(directory):
+        try:
+            os.remove(_pointer(table, directory))
+        except FileNotFoundError:
+            pass
+
+
+# ------------------ Export ------------------
+def _encode(values, kind, manifest, column):
+    if kind == "category":
+        labels = manifest["categories"].setdefault(column, [])
+        text = values.astype(object).where(values.notna()).map(str, na_action="ignore")
+        known = set(labels)
+        labels.extend(label for label in text.dropna().unique() if label not in known)
+        return pd.Categorical(text, categories=labels).codes.astype(STORAGE[kind])
+    if kind == "int8":
+        return pd.to_numeric(values, errors="coerce").round().fillna(-1).to_numpy(STORAGE[kind])
+    if kind == "datetime64[s]":
+        return pd.to_datetime(values, errors="coerce").to_numpy(STORAGE[kind])
+    return pd.to_numeric(values, errors="coerce").to_numpy(STORAGE[kind])
+
+def _append(table, path, manifest, chunk_size):
+    kinds = {"id": "int64", **TABLES[table]}
+    # Drop whatever an interrupted run wrote past the last saved manifest
+    for column, kind in kinds.items():
+        with open(os.path.join(path, column + ".bin"), "ab") as f:
+            f.truncate(manifest["rows"] * np.dtype(STORAGE[kind]).itemsize)
+    sql = f"SELECT {', '.join(kinds)} FROM {table} WHERE id > %s ORDER BY id"
+    added = 0
+    chunks = db.stream(sql, (manifest["last_id"],), chunk_size)
+    try:
+        for chunk in chunks:
+            frame = pd.DataFrame.from_records(chunk, columns=list(kinds))
+            for column, kind in kinds.items():
+                with open(os.path.join(path, column + ".bin"), "ab") as f:
+                    f.write(_encode(frame[column], kind, manifest, column).tobytes())
+            manifest["rows"] += len(frame)
+            manifest["last_id"] = int(frame["id"].iloc[-1])
+            _save_manifest(path, manifest)  # the rows become visible to readers here
+            added += len(frame)
+    finally:
+        chunks.close()
+    manifest["synced_at"] = time.time()
+    _save_manifest(path, manifest)
+    return added
+
+def _remove_stale(table, directory, keep):
+    # Builds older than the live one (and the old <table>, .new, .old layout); the build
+    # just replaced lives until the next rebuild, so readers that resolved it can finish
+    for name in os.listdir(directory):
+        if name.partition(".")[0] == table and name != keep and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def _rebuild(table, directory, chunk_size):
+    # Build into a new directory next to the live one, then repoint <table>.current
+    current = table_dir(table, directory)
+    _remove_stale(table, directory, keep=current and os.path.basename(current))
+    name = f"{table}.{time.time_ns()}"
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    manifest = {"table": table, "rows": 0, "last_id": 0, "columns": TABLES[table], "categories": {},
+                "verified_at": time.time()}
+    _save_manifest(path, manifest)
+    added = _append(table, path, manifest, chunk_size)
+    tmp = _pointer(table, directory) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, _pointer(table, directory))
+    return added
+
+def _consistent(table, manifest):
+    if manifest.get("columns") != TABLES[table]:
+        return False
+    if time.time() - manifest.get("verified_at", 0) < VERIFY_INTERVAL:
+        return True  # counting the whole table on every sync is too slow
+    started = time.time()
+    row = db.fetchall(f"SELECT COUNT(*) FROM {table} WHERE id <= %s", (manifest["last_id"],))[0]
+    if int(row[0]) != manifest["rows"]:
+        return False
+    manifest["verified_at"] = started  # saved with the next append
+    return True
+
+def sync(table, directory=SNAPSHOT_DIR, chunk_size=CHUNK_SIZE, rebuild=False):
+    # Append rows added since the last sync; returns the number of rows appended
+    with _writer_lock(directory):
+        path = table_dir(table, directory)
+        manifest = None if rebuild else _load(path)
+        if manifest is None or not _consistent(table, manifest):
+            return _rebuild(table, directory, chunk_size)
+        return _append(table, path, manifest, chunk_size)
+
+def start_refresher(interval, tables=tuple(TABLES), directory=SNAPSHOT_DIR):
+    def run(stop):
+        while True:
+            for table in tables:
+                try:
+                    sync(table, directory)
+                except Exception:
+                    continue
+            if stop.wait(interval):
+                break
+
+    return prefork.start_thread(run, "snapshot-refresher")
+
+
+# ------------------ Read ------------------
+def district_key(name):
+    # How the MySQL column collation compares districts: case-insensitive, trailing spaces ignored
+    return str(name).rstrip().casefold()
+
+def _column(path, column, kind, rows):
+    if not rows:
+        return np.empty(0, dtype=STORAGE[kind])
+    return np.memmap(os.path.join(path, column + ".bin"), dtype=STORAGE[kind], mode="r", shape=(rows,))
+
+def _decode(values, kind, labels):
+    if kind == "category":
+        return pd.Categorical.from_codes(values, categories=labels or [])
+    if kind == "int8":
+        return pd.arrays.IntegerArray(np.asarray(values), np.asarray(values) < 0)
+    return values
+
+def read(table, columns=None, district=None, directory=SNAPSHOT_DIR):
+    # DataFrame of the requested columns (None: no fresh snapshot), optionally for one district.
+    # Resolves the live build once, so a rebuild swapping it mid-read doesn't mix builds.
+    path = table_dir(table, directory)
+    manifest = _fresh(_load(path))
+    if manifest is None:
+        return None
+    kinds = {"id": "int64", **manifest["columns"]}
+    columns = columns or list(kinds)
+    unknown = set(columns) - set(kinds)
+    if unknown:
+        raise ValueError(f"Unknown {table} snapshot columns: {sorted(unknown)}")
+    rows = manifest["rows"]
+    labels = manifest["categories"]
+
+    selected = None
+    if district is not None:
+        codes = _column(path, "district", "category", rows)
+        key = district_key(district)
+        matching = [code for code, label in enumerate(labels.get("district", [])) if district_key(label) == key]
+        selected = np.flatnonzero(np.isin(codes, matching))
+    frame = {}
+    for column in columns:
+        values = _column(path, column, kinds[column], rows)
+        if selected is not None:
+            values = values[selected]
+        frame[column] = _decode(values, kinds[column], labels.get(column))
+    return pd.DataFrame(frame, columns=columns, copy=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new feedback rows to the local columnar snapshot")
+    parser.add_argument("--table", choices=sorted(TABLES))
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--watch", type=float, help="keep syncing every N seconds")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    tables = [args.table] if args.table else list(TABLES)
+    rebuild = args.rebuild
+    while True:
+        for table in tables:
+            start = time.perf_counter()
+            added = sync(table, args.dir, rebuild=rebuild)
+            manifest = load_manifest(table, args.dir)
+            size = sum(os.path.getsize(os.path.join(table_dir(table, args.dir), name))
+                       for name in os.listdir(table_dir(table, args.dir)))
+            print(f"{table}: +{added} rows, {manifest['rows']} total, {size / 1e6:.1f} MB "
+                  f"({time.perf_counter() - start:.2f}s)")
+        if not args.watch:
+            break
+        rebuild = False
+        time.sleep(args.watch)
@@ -0,0 +1,230 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import db
+import metrics
+import prefork
+
+# Write-behind queue for completed feedback sessions (app.py / project.py).
+# next_question hands the finished row to submit() and returns straight away;
+# a background thread INSERTs queued rows with executemany, in batches of
+# batch_size or every flush_interval seconds, whichever comes first.
+#
+# Every row is appended to a local spool file before it is queued and acked
+# there once committed, so rows still pending when the process dies are
+# replayed on the next start (pass fsync=True to survive power loss too).
+# When the queue is full, submit() blocks for up to put_timeout seconds
+# (backpressure) and then inserts the row itself; if that insert fails the row
+# is already spooled, so it is handed to the writer thread to retry.
+#
+# Only transient database errors (db.is_transient) are retried. A row the
+# database rejects outright is moved to a dead-letter file next to the spool
+# (district_feedback.dead) and acked, so it can't wedge the writer.
+#
+# after_write(cursor, rows) runs in the same transaction as each batch INSERT,
+# for tables that are maintained alongside the feedback rows.
+#
+# Under prefork.py each worker gets its own spool (district_feedback.3.spool for
+# worker 3) and writer thread; the parent flushes before forking and writes what
+# workers of an earlier run left behind.
+
+
+class FeedbackWriter:
+    def __init__(self, insert_sql, spool_path, batch_size=50, flush_interval=1.0,
+                 max_queue=1000, put_timeout=5.0, max_backoff=30.0, fsync=False, after_write=None):
+        self.insert_sql = insert_sql
+        self.spool_path = spool_path
+        self.name = os.path.splitext(os.path.basename(spool_path))[0]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_backoff = max_backoff
+        self.fsync = fsync
+        self.after_write = after_write
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "retries": 0, "direct": 0, "dead": 0}
+        self._queue = queue.Queue(max_queue)
+        self._spool_lock = threading.Lock()
+        self._unqueued = []  # spooled rows whose direct write failed, retried by the writer thread
+        self._next_id = 0
+        self._pending = 0
+        self._thread = None
+        self._stopping = threading.Event()
+        self._forkable = False
+        # Rows left over from a previous run; queued again once the writer starts
+        self._replay = self._spool_replay()
+
+    # ------------------ Producer side ------------------
+    def submit(self, row):
+        rid = self._spool_append(row)
+        self.stats["submitted"] += 1
+        try:
+            self._queue.put((rid, row), timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure exhausted: write on the caller's thread rather than drop it
+            self.stats["direct"] += 1
+            try:
+                self._write([(rid, row)])
+            except Exception as err:
+                if not db.is_transient(err):
+                    self._dead_letter([(rid, row)], err)
+                    return
+                # Durably spooled: the caller is done, the writer thread retries it
+                with self._spool_lock:
+                    self._unqueued.append((rid, row))
+
+    # ------------------ Writer thread ------------------
+    def start(self):
+        if self._thread is not None:
+            return self
+        pending, self._replay = self._replay, []
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+        for item in pending:
+            self._queue.put(item)
+        atexit.register(self.stop)
+        if not self._forkable:
+            self._forkable = True
+            prefork.register(before=self._before_fork, after=self._after_fork)
+        return self
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _before_fork(self):
+        self.stop()
+        root, ext = os.path.splitext(self.spool_path)
+        for path in sorted(glob.glob(f"{root}.*{ext}")):
+            leftover = FeedbackWriter(self.insert_sql, path, after_write=self.after_write)
+            try:
+                if leftover._replay:
+                    leftover._write(leftover._replay)
+            except Exception:
+                pass  # the worker with that number replays it
+
+    def _after_fork(self, worker):
+        root, ext = os.path.splitext(self.spool_path)
+        self.spool_path = f"{root}.{worker}{ext}"
+        self.stats = dict.fromkeys(self.stats, 0)
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._spool_lock = threading.Lock()
+        self._unqueued = []
+        self._stopping = threading.Event()
+        self._thread = None
+        self._replay = self._spool_replay()
+        self.start()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            with self._spool_lock:
+                batch += self._unqueued
+                self._unqueued = []
+            if batch:
+                self._write_with_retry(batch)
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_with_retry(self, batch):
+        backoff = 0.5
+        while True:
+            try:
+                self._write(batch)
+                return
+            except Exception as err:
+                if not db.is_transient(err):
+                    # Find the offending row(s): write the rest one by one
+                    if len(batch) == 1:
+                        self._dead_letter(batch, err)
+                    else:
+                        for item in batch:
+                            self._write_with_retry([item])
+                    return
+                # Rows stay in the spool; keep retrying until the database is back
+                self.stats["retries"] += 1
+                if self._stopping.wait(backoff):
+                    return
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _write(self, batch):
+        with metrics.timed("lawbot_db_write_seconds", writer=self.name), db.cursor(commit=True) as cur:
+            rows = [row for _, row in batch]
+            cur.executemany(self.insert_sql, rows)
+            if self.after_write is not None:
+                self.after_write(cur, rows)
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self._spool_ack([rid for rid, _ in batch])
+
+    def _dead_letter(self, batch, err):
+        with self._spool_lock:
+            with open(os.path.splitext(self.spool_path)[0] + ".dead", "a", encoding="utf-8") as f:
+                for _, row in batch:
+                    f.write(json.dumps({"row": list(row), "error": str(err), "at": time.time()}, default=str) + "\n")
+        self.stats["dead"] += len(batch)
+        metrics.inc("lawbot_feedback_dead_letters_total", len(batch), writer=self.name)
+        self._spool_ack([rid for rid, _ in batch])
+
+    # ------------------ Spool file ------------------
+    def _spool_append(self, row):
+        with self._spool_lock:
+            self._next_id += 1
+            self._pending += 1
+            self._spool_write({"id": self._next_id, "row": list(row)})
+            return self._next_id
+
+    def _spool_ack(self, ids):
+        with self._spool_lock:
+            self._pending -= len(ids)
+            if self._pending <= 0:
+                # Everything written: start the spool afresh instead of growing it forever
+                self._pending = 0
+                open(self.spool_path, "w").close()
+            else:
+                self._spool_write({"ack": ids})
+
+    def _spool_write(self, record):
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _spool_replay(self):
+        rows, acked = {}, set()
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash mid-write
+                    if "ack" in record:
+                        acked.update(record["ack"])
+                    else:
+                        rows[record["id"]] = tuple(record["row"])
+        except OSError:
+            return []
+        pending = [(rid, row) for rid, row in sorted(rows.items()) if rid not in acked]
+        with self._spool_lock:
+            self._next_id = max(rows, default=0)
+            self._pending = len(pending)
+        return pending
@@ -0,0 +1,216 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+# Per-state TopoJSON tiles for the /tamil_heatmap page.
+# india-districts-727.json covers every district in India (~700 KB); the map only
+# needs one state. build_state() cuts out that state's districts and the arcs
+# they use, re-quantizes them to the state's own bounding box and simplifies
+# each arc (endpoints kept, so shared borders still line up). Each geometry gets
+# a normalized "key" so feedback counts join to it without fuzzy matching.
+#
+#   python geo_tiles.py                      build every state into geo/
+#   python geo_tiles.py "Tamil Nadu" ...     build only these states
+
+SOURCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "india-districts-727.json")
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo")
+QUANTIZATION = 10000
+TOLERANCE = 2.0  # in output grid units
+
+# Spellings that normalize() alone does not bring together
+DISTRICT_ALIASES = {
+    "kanyakumari": "Kanniyakumari",
+    "tuticorin": "Thoothukkudi",
+    "trichy": "Tiruchirappalli",
+    "tiruchy": "Tiruchirappalli",
+    "villupuram": "Viluppuram",
+    "kanchipuram": "Kancheepuram",
+    "tanjore": "Thanjavur",
+    "sivagangai": "Sivaganga",
+    "ooty": "The Nilgiris",
+    "tirupur": "Tiruppur",
+    "ramnad": "Ramanathapuram",
+}
+
+
+# ------------------ District names ------------------
+def normalize(name):
+    key = re.sub(r"^the\s+", "", (name or "").strip().lower())
+    key = re.sub(r"[^a-z]", "", key)
+    key = key.replace("th", "t")
+    return re.sub(r"(.)\1+", r"\1", key)
+
+_ALIAS_KEYS = {normalize(alias): normalize(canonical) for alias, canonical in DISTRICT_ALIASES.items()}
+
+def district_key(name):
+    key = normalize(name)
+    return _ALIAS_KEYS.get(key, key)
+
+def keyed_counts(counts):
+    # {district name as stored in feedback: value} -> {geometry key: value}
+    keyed = {}
+    for name, value in counts.items():
+        keyed[district_key(name)] = value
+    return keyed
+
+
+# ------------------ Geometry ------------------
+def _decode_arc(arc):
+    x = y = 0
+    points = []
+    for dx, dy in arc:
+        x += dx
+        y += dy
+        points.append((x, y))
+    return points
+
+def _encode_arc(points):
+    encoded, px, py = [], 0, 0
+    for x, y in points:
+        if encoded and x == px and y == py:
+            continue
+        encoded.append([x - px, y - py])
+        px, py = x, y
+    if len(encoded) < 2:
+        encoded.append([0, 0])  # an arc needs two positions even if they coincide
+    return encoded
+
+def _simplify(points, tolerance):
+    # Douglas-Peucker, iterative; endpoints always kept
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        norm = (dx * dx + dy * dy) ** 0.5
+        best, index = -1.0, None
+        for i in range(first + 1, last):
+            x, y = points[i]
+            if norm:
+                dist = abs(dy * x - dx * y + x2 * y1 - y2 * x1) / norm
+            else:
+                dist = ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+            if dist > best:
+                best, index = dist, i
+        if index is not None and best > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+def _walk_arcs(arcs, fn):
+    # Apply fn to every arc index in a (Multi)Polygon arcs structure
+    if isinstance(arcs, int):
+        return fn(arcs)
+    return [_walk_arcs(a, fn) for a in arcs]
+
+def build_state(topology, state, quantization=QUANTIZATION, tolerance=TOLERANCE):
+    (name, collection), = topology["objects"].items()
+    geometries = [g for g in collection["geometries"] if g.get("properties", {}).get("st_nm") == state]
+    if not geometries:
+        raise KeyError(f"No districts for state {state!r}")
+    scale, translate = topology["transform"]["scale"], topology["transform"]["translate"]
+
+    # Old arc index -> new arc index, in first-use order
+    used = {}
+    def collect(i):
+        used.setdefault(i if i >= 0 else ~i, len(used))
+        return i
+    for g in geometries:
+        _walk_arcs(g["arcs"], collect)
+
+    old_arcs = {i: [(x * scale[0] + translate[0], y * scale[1] + translate[1])
+                    for x, y in _decode_arc(topology["arcs"][i])] for i in used}
+    xs = [x for pts in old_arcs.values() for x, _ in pts]
+    ys = [y for pts in old_arcs.values() for _, y in pts]
+    min_x, min_y = min(xs), min(ys)
+    kx = (max(xs) - min_x) / (quantization - 1) or 1
+    ky = (max(ys) - min_y) / (quantization - 1) or 1
+
+    arcs = [None] * len(used)
+    for old, new in used.items():
+        points = [(round((x - min_x) / kx), round((y - min_y) / ky)) for x, y in old_arcs[old]]
+        simplified = _simplify(points, tolerance)
+        if points[0] == points[-1] and len(simplified) < 4:
+            simplified = points  # a closed ring must keep enough points to stay a ring
+        arcs[new] = _encode_arc(simplified)
+
+    def remap(i):
+        return used[i] if i >= 0 else ~used[~i]
+    out_geometries = []
+    for g in geometries:
+        properties = dict(g.get("properties", {}))
+        properties["key"] = district_key(properties.get("district"))
+        out_geometries.append({"type": g["type"], "arcs": _walk_arcs(g["arcs"], remap),
+                               "properties": properties})
+
+    return {"type": "Topology",
+            "transform": {"scale": [kx, ky], "translate": [min_x, min_y]},
+            "objects": {name: {"type": "GeometryCollection", "geometries": out_geometries}},
+            "arcs": arcs}
+
+
+# ------------------ Artifacts ------------------
+def state_slug(state):
+    return re.sub(r"[^a-z0-9]+", "-", state.lower()).strip("-")
+
+def write_artifacts(tile, path):
+    # Minified JSON plus gzip (and brotli, if installed) copies for precompressed serving
+    return write_compressed(json.dumps(tile, separators=(",", ":")).encode("utf-8"), path)
+
+def _write_atomic(path, data):
+    # Temp file in the same directory, then rename: a concurrent request sees the old
+    # file or the new one, never a partly written one
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)  # mkstemp creates it 0600
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def write_compressed(data, path):
+    # Compressed copies first: the plain file appearing is what marks the set as built
+    _write_atomic(path + ".gz", gzip.compress(data, compresslevel=9))
+    try:
+        import brotli
+        _write_atomic(path + ".br", brotli.compress(data, quality=11))
+    except ImportError:
+        pass
+    _write_atomic(path, data)
+    return hashlib.sha1(data).hexdigest()[:12]
+
+def build_all(states=None, source=SOURCE_FILE, output_dir=OUTPUT_DIR, **options):
+    with open(source, encoding="utf-8") as f:
+        topology = json.load(f)
+    if not states:
+        (collection,) = topology["objects"].values()
+        states = sorted({g["properties"]["st_nm"] for g in collection["geometries"]})
+    os.makedirs(output_dir, exist_ok=True)
+    built = {}
+    for state in states:
+        path = os.path.join(output_dir, state_slug(state) + ".topo.json")
+        built[state] = (path, write_artifacts(build_state(topology, state, **options), path))
+    return built
+
+def tile_path(state, output_dir=OUTPUT_DIR):
+    # Path of a state's tile, building it on first use
+    path = os.path.join(output_dir, state_slug(state) + ".topo.json")
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(SOURCE_FILE):
+        build_all([state], output_dir=output_dir)
+    return path
+
+
+if __name__ == "__main__":
+    for state, (path, digest) in build_all(sys.argv[1:]).items():
+        print(f"{state}: {path} ({os.path.getsize(path)} bytes, {os.path.getsize(path + '.gz')} gzipped)")
@@ -0,0 +1,122 @@
+import re
+import threading
+
+# Offline language detection, tried before the remote translator.detect call.
+# Indic scripts are identified from their Unicode blocks; Latin-script text is
+# scored against a small English character-trigram profile plus a list of very
+# common English words. Only confident results are used; anything else is left
+# for googletrans.
+
+# (first code point, last code point, language)
+SCRIPT_RANGES = [
+    (0x0B80, 0x0BFF, "ta"),  # Tamil
+    (0x0900, 0x097F, "hi"),  # Devanagari
+    (0x0980, 0x09FF, "bn"),  # Bengali
+    (0x0A00, 0x0A7F, "pa"),  # Gurmukhi
+    (0x0A80, 0x0AFF, "gu"),  # Gujarati
+    (0x0B00, 0x0B7F, "or"),  # Odia
+    (0x0C00, 0x0C7F, "te"),  # Telugu
+    (0x0C80, 0x0CFF, "kn"),  # Kannada
+    (0x0D00, 0x0D7F, "ml"),  # Malayalam
+]
+# Devanagari is shared by Hindi, Marathi, Nepali...: leave those to the translator
+SHARED_SCRIPT_CONFIDENCE = {"hi": 0.7}
+
+COMMON_ENGLISH = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does done
+don't for from get good had has have he her here him his how i i'm if in into is it it's its just
+know like more most much my no not now of on one only or other our out people please should so some
+than that the their them then there they think this those to too under up us very was we well were
+what when where which who why will with would yes you your ok okay fine bad poor great better worse
+nothing really very government police court law service services road roads help people district
+""".split())
+
+# Representative English text; its trigrams form the Latin-script model
+ENGLISH_SAMPLE = """
+the people in our district trust the administration but services are slow and not very responsive
+roads and transport need improvement the hospital and school are good but sanitation is poor
+police are helpful and we feel safe at night there is corruption in some offices and courts take
+too long to resolve cases legal aid should be easily accessible to everyone in the community
+there are not enough jobs or business opportunities the environment is clean and green
+justice can be achieved when laws are applied fairly and officials are honest and transparent
+when we went to the office to apply for a certificate the staff asked us to come back again and again
+water supply electricity and drainage are regular in towns but villages still struggle with basic facilities
+teachers doctors nurses and officers should be appointed in every block and paid on time
+the bus service is frequent but buses are crowded and old the train station is far from our village
+farmers need better prices markets storage and loans young people are leaving for cities to find work
+women and children should be protected complaints must be registered without delay and followed up
+meetings are held but citizens are rarely consulted and decisions are taken without asking anyone
+garbage is collected irregularly and the lake is polluted by waste from factories and hotels
+everything depends on who you know otherwise nothing moves and people lose hope in the system
+""" + " ".join(COMMON_ENGLISH)
+
+MIN_CONFIDENCE = 0.8
+WORD_RE = re.compile(r"[a-z']+")
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+ENGLISH_TRIGRAMS = frozenset(t for w in WORD_RE.findall(ENGLISH_SAMPLE) for t in _trigrams(w))
+
+
+def detect(text):
+    # (language, confidence in [0, 1])
+    letters = script_counts = 0
+    counts = {}
+    latin = 0
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        letters += 1
+        cp = ord(ch)
+        if cp < 0x0250:
+            latin += 1
+            continue
+        for first, last, lang in SCRIPT_RANGES:
+            if first <= cp <= last:
+                counts[lang] = counts.get(lang, 0) + 1
+                script_counts += 1
+                break
+    if letters == 0:
+        return "en", 1.0  # numbers / punctuation only: nothing to translate
+
+    if script_counts > latin:
+        lang = max(counts, key=counts.get)
+        share = counts[lang] / letters
+        return lang, share * SHARED_SCRIPT_CONFIDENCE.get(lang, 1.0)
+
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return "en", 0.0
+    common = sum(w in COMMON_ENGLISH for w in words) / len(words)
+    grams = [t for w in words for t in _trigrams(w)]
+    profile = sum(t in ENGLISH_TRIGRAMS for t in grams) / len(grams)
+    latin_share = latin / letters
+    return "en", min(1.0, 0.75 * profile + 0.6 * common) * latin_share
+
+
+class DetectorStats:
+    def __init__(self):
+        self.calls = 0
+        self.local = 0
+        self.fallbacks = 0
+        self.confidence_total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, confidence, used_local):
+        with self._lock:
+            self.calls += 1
+            self.confidence_total += confidence
+            if used_local:
+                self.local += 1
+            else:
+                self.fallbacks += 1
+
+    def snapshot(self):
+        with self._lock:
+            calls = self.calls
+            return {"calls": calls, "local": self.local, "fallbacks": self.fallbacks,
+                    "fallback_rate": self.fallbacks / calls if calls else 0.0,
+                    "mean_confidence": self.confidence_total / calls if calls else 0.0}
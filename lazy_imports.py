@@ -0,0 +1,83 @@
+import importlib
+import sys
+import threading
+import time
+
+# Deferred imports for the heavy plotting / data stack used by powerbiapp.py.
+#   pd = lazy_imports.lazy("pandas")
+# binds a placeholder whose first attribute access imports the real module, so a
+# worker that only serves /tamil_heatmap, /metrics or /healthz never loads it.
+# import_times records how long each deferred import took when it happened.
+#
+#   python lazy_imports.py powerbiapp [--budget-ms 1500]
+# imports the module cold, lists what it pulled in eagerly, then loads every
+# deferred module and reports the time each one costs. Exits with status 1 when
+# the cold import exceeds the budget.
+
+import_times = {}
+_registry = {}
+_lock = threading.RLock()
+
+
+class LazyModule:
+    def __init__(self, name, before=None):
+        self._name = name
+        self._before = before
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    if self._before is not None:
+                        self._before()
+                    module = importlib.import_module(self._name)
+                    import_times.setdefault(self._name, time.perf_counter() - start)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy(name, before=None):
+    # One placeholder per module name, shared by every importer
+    with _lock:
+        module = _registry.get(name)
+        if module is None:
+            module = _registry[name] = LazyModule(name, before)
+        return module
+
+def load_all():
+    # Pre-fork warmup: import everything deferred so forked workers share it
+    for module in list(_registry.values()):
+        module.load()
+    return dict(import_times)
+
+def loaded():
+    return sorted(name for name, module in _registry.items() if module._module is not None)
+
+
+if __name__ == "__main__":
+    import lazy_imports  # the target registers with the importable module, not this __main__ copy
+    target = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("-") else "powerbiapp"
+    budget_ms = float(sys.argv[sys.argv.index("--budget-ms") + 1]) if "--budget-ms" in sys.argv else None
+
+    before = set(sys.modules)
+    start = time.perf_counter()
+    importlib.import_module(target)
+    cold_ms = (time.perf_counter() - start) * 1000
+    heavy = sorted({m.split(".")[0] for m in set(sys.modules) - before} &
+                   {"pandas", "numpy", "plotly", "matplotlib", "seaborn", "wordcloud", "PIL", "scipy"})
+    print(f"import {target}: {cold_ms:.0f} ms" + (f" (budget {budget_ms:.0f} ms)" if budget_ms else ""))
+    print(f"  heavy packages loaded eagerly: {', '.join(heavy) or 'none'}")
+
+    print("deferred imports (cost paid by the first request that needs them):")
+    for name, seconds in sorted(lazy_imports.load_all().items(), key=lambda item: -item[1]):
+        print(f"  {name:28} {seconds * 1000:8.0f} ms")
+    sys.exit(1 if budget_ms is not None and cold_ms > budget_ms else 0)
@@ -1,34 +1,143 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 import mysql.connector
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import db
+import metrics
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS so your HTML can fetch data
 
-# MySQL connection config
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'chatbot_db'
-}
+# Seconds between background refreshes of the cached /counts snapshot
+REFRESH_INTERVAL = float(os.environ.get("LAWBOT_COUNTS_REFRESH", "30"))
+# POST /counts/refresh is accepted from localhost, or with this token in X-Refresh-Token
+REFRESH_TOKEN = os.environ.get("LAWBOT_COUNTS_REFRESH_TOKEN", "")
+
+
+# ------------------ Cached snapshot ------------------
+# /counts is polled constantly by Power BI and the JS map, so it is served from
+# an in-memory snapshot refreshed in the background (or via POST /counts/refresh).
+# Every change bumps the version; clients can send If-None-Match/If-Modified-Since
+# for a 304, or ?since=<version> to get only the districts that changed.
+class CountsSnapshot:
+    def __init__(self):
+        self.epoch = str(int(time.time()))  # versions from an earlier process are not comparable
+        self.version = 0
+        self.counts = None
+        self.changed_at = {}  # district -> version it last changed in (value None once removed)
+        self.removed = {}
+        self.last_modified = None
+        # (counts, tag, last_modified) of the latest version, replaced as a whole on each
+        # change so a request never pairs one version's body with another's ETag
+        self.current = None
+        self._lock = threading.Lock()
+
+    @metrics.timed("lawbot_counts_refresh_seconds")
+    def refresh(self):
+        results = db.fetchall("SELECT district, value FROM district_counts", dictionary=True)  # Adjust table/columns
+        counts = {row['district']: float(row['value']) for row in results}
+        with self._lock:
+            if counts == self.counts:
+                return False
+            previous = self.counts or {}
+            self.version += 1
+            for district, value in counts.items():
+                if previous.get(district) != value or district not in previous:
+                    self.changed_at[district] = self.version
+                    self.removed.pop(district, None)
+            for district in previous.keys() - counts.keys():
+                self.changed_at.pop(district, None)
+                self.removed[district] = self.version
+            self.counts = counts
+            self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self.current = (counts, self.tag(), self.last_modified)
+            return True
+
+    def tag(self):
+        return f"{self.epoch}-{self.version}"
+
+    def changes_since(self, tag):
+        # (current, changed, removed) read together; changed is None if the tag is not
+        # from this snapshot's history (the client needs everything)
+        epoch, _, version = (tag or "").partition("-")
+        with self._lock:
+            if epoch != self.epoch or not version.isdigit() or int(version) > self.version:
+                return self.current, None, None
+            version = int(version)
+            changed = {d: self.counts[d] for d, v in self.changed_at.items() if v > version}
+            removed = [d for d, v in self.removed.items() if v > version]
+            return self.current, changed, removed
+
+
+snapshot = CountsSnapshot()
+
+# /metrics: per-endpoint request timings (get_counts included), refresh timings, pool stats
+metrics.install(app)
+metrics.register_gauges("lawbot_db_pool", db.stats)
+metrics.register_gauges("lawbot_counts", lambda: {"version": snapshot.version,
+                                                  "districts": len(snapshot.counts or {})})
+
+def _refresh_loop():
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        try:
+            snapshot.refresh()
+        except Exception:
+            # Keep serving the last good snapshot, and keep trying
+            metrics.inc("lawbot_counts_refresh_errors_total")
+            app.logger.exception("counts refresh failed")
+
+_refresher = None
+
+def start_refresher():
+    global _refresher
+    if _refresher is None:
+        _refresher = threading.Thread(target=_refresh_loop, name="counts-refresher", daemon=True)
+        _refresher.start()
+
 
 @app.route('/counts')
 def get_counts():
     try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT district, value FROM district_counts")  # Adjust table/columns
-        results = cursor.fetchall()
-
-        counts = {row['district']: float(row['value']) for row in results}
+        if snapshot.current is None:
+            snapshot.refresh()
+            start_refresher()
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
 
-        cursor.close()
-        conn.close()
-        return jsonify(counts)
+    since = request.args.get('since')
+    if since is not None:
+        (counts, tag, last_modified), changed, removed = snapshot.changes_since(since)
+        if changed is None:
+            response = jsonify({"version": tag, "full": True, "changes": counts, "removed": []})
+        else:
+            response = jsonify({"version": tag, "full": False, "changes": changed, "removed": removed})
+    else:
+        counts, tag, last_modified = snapshot.current
+        response = jsonify(counts)
+    response.set_etag(tag)
+    response.last_modified = last_modified
+    response.headers['X-Counts-Version'] = tag
+    response.cache_control.no_cache = True  # always revalidate, but 304s are cheap
+    return response.make_conditional(request)
 
+@app.route('/counts/refresh', methods=['POST'])
+def refresh_counts():
+    # Write notification: whoever updates district_counts can ask for an immediate refresh
+    token = request.headers.get('X-Refresh-Token', '')
+    if request.remote_addr not in ('127.0.0.1', '::1') and not (
+            REFRESH_TOKEN and hmac.compare_digest(token.encode(), REFRESH_TOKEN.encode())):
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        changed = snapshot.refresh()
+        start_refresher()
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
+    return jsonify({"version": snapshot.current[1], "changed": changed})
 
 if __name__ == '__main__':
     app.run(debug=True)
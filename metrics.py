@@ -0,0 +1,223 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import Response, g, request
+
+# In-process timings and counters for every app, served as Prometheus text on /metrics.
+#
+#   with metrics.timed("lawbot_translation_seconds", direction="to_english"): ...
+#   @metrics.timed("lawbot_score_seconds")
+#   metrics.inc("lawbot_faq_answers_total")
+#   metrics.register_gauges("lawbot_db_pool", db.stats)    numbers read at scrape time
+#
+# metrics.install(app) adds the /metrics route and per-endpoint request timing.
+# With LAWBOT_PROFILE_SLOW_MS set, requests are also sampled every
+# LAWBOT_PROFILE_INTERVAL_MS and any slower than the threshold leave a
+# collapsed-stack file (flamegraph.pl / speedscope input) in LAWBOT_PROFILE_DIR.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_SLOW_MS = float(os.environ.get("LAWBOT_PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL = float(os.environ.get("LAWBOT_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.environ.get("LAWBOT_PROFILE_DIR", "profiles")
+
+
+# ------------------ Registry ------------------
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauges = []      # (prefix, fn, labels)
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def register_gauges(self, prefix, fn, **labels):
+        # fn() -> {stat: number}; each numeric entry becomes the gauge <prefix>_<stat>
+        self.gauges.append((prefix, fn, tuple(sorted(labels.items()))))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            snapshots = [(h.buckets, list(h.counts), h.sum, h.count) for _, h in histograms]
+        typed = set()
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for ((name, labels), _), (buckets, counts, total, count) in zip(histograms, snapshots):
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        families = {}  # samples of one gauge must be contiguous, whichever fn they came from
+        for prefix, fn, labels in self.gauges:
+            try:
+                values = fn()
+            except Exception:
+                continue  # e.g. the database is down: skip rather than fail the scrape
+            for stat, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                families.setdefault(f"{prefix}_{stat}", []).append(f"{prefix}_{stat}{_labels(labels)} {_number(value)}")
+        for name, samples in families.items():
+            declare(name, "gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+register_gauges = REGISTRY.register_gauges
+render = REGISTRY.render
+
+
+# ------------------ Timing ------------------
+class timed:
+    # Context manager or decorator recording elapsed seconds into a histogram
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self._start, **self.labels)
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(self.name, time.perf_counter() - start, **self.labels)
+        return wrapper
+
+
+# ------------------ Slow request profiler ------------------
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms, interval=PROFILE_INTERVAL, directory=PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.directory = directory
+        self._active = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, elapsed, name):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or elapsed < self.threshold:
+            return None
+        inc("lawbot_slow_requests_total", endpoint=name)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int(elapsed * 1000)}ms.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+# ------------------ Flask ------------------
+def install(app, profile_slow_ms=PROFILE_SLOW_MS):
+    profiler = SlowRequestProfiler(profile_slow_ms) if profile_slow_ms > 0 else None
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+        if profiler is not None:
+            profiler.begin()
+
+    @app.teardown_request
+    def _record_request(exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        observe("lawbot_http_request_seconds", elapsed, endpoint=endpoint)
+        if profiler is not None:
+            profiler.end(elapsed, endpoint)
+
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint)
+    return profiler
@@ -1,16 +1,20 @@
-from chatterbot import ChatBot
-from chatterbot.trainers import ListTrainer
+import difflib
+import hashlib
+import json
 import os
+import re
+import sys
 
-# Create a new chatbot instance
-bot = ChatBot(
-    'InteractiveBot',
-    storage_adapter='chatterbot.storage.SQLStorageAdapter'
-)
+# Training is a separate, idempotent build step keyed by a hash of the corpus:
+#   python nlp_analysis.py --build    (re)train ChatterBot and write the response index
+#   python nlp_analysis.py            chat, using the prebuilt index
+# Restarting the bot no longer re-inserts the conversation, so the statement
+# table stays the same size and startup / response time stay flat.
 
-# Use a list of custom conversations to train the bot
-trainer = ListTrainer(bot)
-trainer.train([
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_index.json")
+
+# Custom conversation the bot is trained on
+CONVERSATION = [
     "Hello",
     "Hi there!",
     "How are you?",
@@ -21,19 +25,101 @@ trainer.train([
     "Why don't scientists trust atoms? Because they make up everything!",
     "Bye",
     "Goodbye! Have a great day."
-])
+]
+
+FALLBACK_RESPONSE = "Sorry, I didn't get that. Could you rephrase?"
+
+
+def corpus_hash(conversation=CONVERSATION):
+    return hashlib.sha256(json.dumps(conversation).encode("utf-8")).hexdigest()
+
+def normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
 
-# Interactive chat loop
-print("Bot: Hi! I am your interactive bot. Type 'bye' to exit.")
-while True:
+def build_response_index(conversation=CONVERSATION):
+    # Same pairing ListTrainer uses (each line answers the one before), deduplicated
+    responses = {}
+    for statement, response in zip(conversation, conversation[1:]):
+        responses.setdefault(normalize(statement), response)
+    return responses
+
+
+# ------------------ Build step ------------------
+def create_bot(read_only=True):
+    # Only the build step trains; a serving bot must not learn from every get_response()
+    from chatterbot import ChatBot
+    return ChatBot(
+        'InteractiveBot',
+        storage_adapter='chatterbot.storage.SQLStorageAdapter',
+        read_only=read_only
+    )
+
+def load_index(path=INDEX_FILE):
     try:
-        user_input = input("You: ")
-        if user_input.lower() == 'bye':
-            print("Bot: Goodbye!")
-            break
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def build(force=False, path=INDEX_FILE):
+    digest = corpus_hash()
+    index = load_index(path)
+    if index and index.get("hash") == digest and not force:
+        return index
 
-        response = bot.get_response(user_input)
-        print(f"Bot: {response}")
+    from chatterbot.trainers import ListTrainer
+    bot = create_bot(read_only=False)
+    # Start from an empty statement table so retraining never duplicates statements
+    bot.storage.drop()
+    bot.storage.create_database()
+    ListTrainer(bot).train(CONVERSATION)
 
-    except (KeyboardInterrupt, EOFError, SystemExit):
-        break
+    index = {"hash": digest, "responses": build_response_index()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return index
+
+
+# ------------------ Runtime ------------------
+class Responder:
+    def __init__(self, index):
+        self.responses = index["responses"]
+        self.keys = list(self.responses)
+        self._bot = None
+
+    def get_response(self, text):
+        key = normalize(text)
+        if key in self.responses:
+            return self.responses[key]
+        close = difflib.get_close_matches(key, self.keys, n=1, cutoff=0.75)
+        if close:
+            return self.responses[close[0]]
+        # Unseen input: ask ChatterBot, created on first need against the prebuilt database
+        if self._bot is None:
+            self._bot = create_bot()
+        return str(self._bot.get_response(text)) or FALLBACK_RESPONSE
+
+
+if __name__ == "__main__":
+    if "--build" in sys.argv:
+        build(force="--force" in sys.argv)
+        print("Chatbot corpus built.")
+        sys.exit(0)
+
+    # Builds only if the corpus changed since the last build
+    bot = Responder(build())
+
+    # Interactive chat loop
+    print("Bot: Hi! I am your interactive bot. Type 'bye' to exit.")
+    while True:
+        try:
+            user_input = input("You: ")
+            if user_input.lower() == 'bye':
+                print("Bot: Goodbye!")
+                break
+
+            response = bot.get_response(user_input)
+            print(f"Bot: {response}")
+
+        except (KeyboardInterrupt, EOFError, SystemExit):
+            break
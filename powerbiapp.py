@@ -1,40 +1,105 @@
-from flask import Flask, render_template
-import mysql.connector
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context, url_for, abort
+import os
+import threading
+import answers
+import chart_cache
+import chart_data
+import db
+import feedback_queries
+import feedback_snapshot
+import geo_tiles
+import lazy_imports
+import metrics
+import rollups
+import term_index
 import base64
+import hashlib
 from io import BytesIO
-import seaborn as sns
+
+# The plotting stack is imported by the first chart that uses it, not at startup,
+# so cold starts are fast and map / health / metrics requests never load it
+def _use_agg():
+    import matplotlib
+    matplotlib.use("Agg")  # headless; must happen before pyplot is first imported
+
+pd = lazy_imports.lazy("pandas")
+px = lazy_imports.lazy("plotly.express")
+go = lazy_imports.lazy("plotly.graph_objects")
+plotly_offline = lazy_imports.lazy("plotly.offline")
+plt = lazy_imports.lazy("matplotlib.pyplot", before=_use_agg)
+sns = lazy_imports.lazy("seaborn", before=plt.load)
+wordcloud = lazy_imports.lazy("wordcloud", before=_use_agg)
 
 app = Flask(__name__)
 
 # ------------------ DB Connection ------------------
-def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="chatbot_db"
-    )
-
-def fetch_feedback():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM justice_feedback", conn)
-    conn.close()
+# Columns the per-row charts (correlation, scatter, justice index) use
+DASHBOARD_COLUMNS = ['district','trust_score','responsiveness_score','fairness_score','accessibility_score',
+                     'corruption_score','community_justice_score','overall_score']
+
+@metrics.timed("lawbot_query_seconds", query="fetch_feedback")
+def fetch_feedback(district=None, columns=DASHBOARD_COLUMNS):
+    # Memory-mapped columnar snapshot when one has been built (feedback_snapshot.py), else MySQL
+    try:
+        df = feedback_snapshot.read("justice_feedback", columns, district=district)
+    except (OSError, ValueError):
+        # A build removed or cut short under us (e.g. invalidated mid-read): treat as no snapshot
+        metrics.inc("lawbot_snapshot_read_errors_total")
+        df = None
+    if df is None:
+        return feedback_queries.fetch_feedback(columns, district=district)
+    metrics.inc("lawbot_snapshot_reads_total")
     return df
 
+# ------------------ Schema ------------------
+# Tables, indexes and rollup / term seeding are checked by the first request that
+# reads feedback, not at import: the app (and /healthz, /readyz, /metrics) starts
+# even if the database is down or project.py has never run against it
+SCHEMA_FREE_ENDPOINTS = {"healthz", "readyz", "metrics", "asset", "geo_tile", "static"}
+_schema = {"ready": False}
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    if _schema["ready"]:
+        return
+    with _schema_lock:
+        if not _schema["ready"]:
+            feedback_queries.ensure_indexes()
+            rollups.ensure_tables()
+            answers.ensure_tables("justice_feedback")
+            term_index.ensure_tables()
+            _schema["ready"] = True
+
+@app.before_request
+def _schema_before_request():
+    if request.endpoint not in SCHEMA_FREE_ENDPOINTS:
+        ensure_schema()
+
+# Rendered charts, reused until the next feedback insert changes the data version
+fragment_cache = chart_cache.FragmentCache(os.environ.get("LAWBOT_CHART_CACHE_DIR"))
+
+def cache_version():
+    # The suffix keeps entries cached as Plotly HTML by older versions from being reused.
+    # Per-row charts read the snapshot, which can lag MySQL, so its watermark is part of the key
+    return f"{feedback_queries.data_version()}/figures/{feedback_snapshot.version('justice_feedback')}"
+
+metrics.install(app)
+metrics.register_gauges("lawbot_db_pool", db.stats)
+
 
 # ------------------ HELPER ------------------
-def create_wordcloud(text):
-    wc = WordCloud(width=800, height=400, background_color="white", colormap='magma').generate(text)
+@metrics.timed("lawbot_chart_seconds", chart="wordcloud")
+def create_wordcloud(frequencies):
+    # frequencies are raw suggestion_terms counts: unlike WordCloud.generate(text) there is no
+    # plural folding and no bigram collocations, so the cloud differs slightly from the old one
+    if not frequencies:
+        return ""
+    wc = wordcloud.WordCloud(width=800, height=400, background_color="white", colormap='magma').generate_from_frequencies(frequencies)
     buf = BytesIO()
     wc.to_image().save(buf, format="PNG")
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 
+@metrics.timed("lawbot_chart_seconds", chart="corr_heatmap")
 def create_corr_heatmap(df):
     plt.figure(figsize=(6, 5))
     sns.heatmap(df.select_dtypes(include=['float','int']).corr(), annot=True, cmap='coolwarm')
@@ -44,75 +109,343 @@ def create_corr_heatmap(df):
     return base64.b64encode(buf.getvalue()).decode('utf-8')
 
 
+# ------------------ PLOTLY RENDERING ------------------
+# Charts are cached as compact figure JSON, not HTML. Each page loads plotly.js once
+# and every chart is a <div> plus a Plotly.newPlot call. LAWBOT_PLOTLY_MODE:
+#   shared (default)  plotly.js from /assets/ (precompressed, cached for a year)
+#   lazy              like shared, but charts are empty placeholders that fetch
+#                     /api/chart/<name> when they scroll into view
+#   inline            plotly.js embedded in the page, for a self-contained download
+PLOTLY_MODE = os.environ.get("LAWBOT_PLOTLY_MODE", "shared")
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# chart name -> dashboard.html variable
+CHART_FIELDS = {'pie': 'pie_html', 'radar': 'radar_html', 'trust_bar': 'bar_html',
+                'trend_line': 'line_html', 'scatter': 'scatter_html', 'justice_index': 'index_html'}
+
+NEW_PLOT = ('<div id="chart-{name}" class="lawbot-chart"></div><script>'
+            'document.addEventListener("DOMContentLoaded",function(){{var f={figure};'
+            'Plotly.newPlot("chart-{name}",f.data,f.layout,{{responsive:true}})}})</script>')
+LAZY_PLOT = '<div id="chart-{name}" class="lawbot-chart" data-chart-src="{src}"></div>'
+LAZY_LOADER = ('<script>document.addEventListener("DOMContentLoaded",function(){'
+               'var io=new IntersectionObserver(function(entries){entries.forEach(function(e){'
+               'if(!e.isIntersecting)return;io.unobserve(e.target);'
+               'fetch(e.target.dataset.chartSrc).then(function(r){return r.json()}).then(function(f){'
+               'Plotly.newPlot(e.target,f.data,f.layout,{responsive:true})})})},{rootMargin:"200px"});'
+               'document.querySelectorAll("[data-chart-src]").forEach(function(el){io.observe(el)})})</script>')
+
+_plotly_asset = None
+
+def figure_json(fig):
+    # px / go already validated the figure while building it
+    return fig.to_json(validate=False)
+
+def plotly_asset():
+    # plotly.min.js (+ .gz / .br) for the installed plotly, written once into ASSET_DIR
+    global _plotly_asset
+    if _plotly_asset is None:
+        path = os.path.join(ASSET_DIR, f"plotly-{plotly_offline.get_plotlyjs_version()}.min.js")
+        if not os.path.exists(path):
+            os.makedirs(ASSET_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}"
+            geo_tiles.write_compressed(plotly_offline.get_plotlyjs().encode("utf-8"), tmp)
+            for suffix in (".br", ".gz", ""):  # the plain file last: its presence marks the set complete
+                if os.path.exists(tmp + suffix):
+                    os.replace(tmp + suffix, path + suffix)
+        _plotly_asset = os.path.basename(path)
+    return _plotly_asset
+
+def page_scripts():
+    if PLOTLY_MODE == "inline":
+        scripts = "<script>" + plotly_offline.get_plotlyjs() + "</script>"
+    else:
+        scripts = f'<script src="{url_for("asset", filename=plotly_asset())}"></script>'
+    return scripts + (LAZY_LOADER if PLOTLY_MODE == "lazy" else "")
+
+def chart_fragments(figures, district=None):
+    # Template variables for the Plotly charts; plotly.js rides in front of the pie chart
+    html = {}
+    for name, field in CHART_FIELDS.items():
+        figure = figures.get(name)
+        if figure is None:
+            html[field] = ""
+        elif PLOTLY_MODE == "lazy":
+            html[field] = LAZY_PLOT.format(name=name, src=url_for("chart_json", name=name, district=district))
+        else:
+            html[field] = NEW_PLOT.format(name=name, figure=figure.replace("</", "<\\/"))
+    html['line_html'] = html['line_html'] or "<p>No date field</p>"
+    html['pie_html'] = page_scripts() + html['pie_html']
+    return html
+
+
+# Past chart_data.RAW_MARKS_MAX rows these two charts are drawn from a density grid /
+# per-district summary instead of one mark per row
+def scatter_figure(df):
+    if chart_data.use_raw(len(df)):
+        return px.scatter(df,x='overall_score',y='trust_score',color='district',title='Sentiment vs Trust')
+    xs, ys, z = chart_data.density_grid(df['overall_score'], df['trust_score'])
+    fig = go.Figure(go.Heatmap(x=xs, y=ys, z=z, colorscale='Blues', colorbar=dict(title='Responses'),
+                               hovertemplate='overall %{x:.2f}, trust %{y:.2f}: %{z} responses<extra></extra>'))
+    names, counts, mean_x, mean_y = chart_data.group_means(df['district'], df['overall_score'], df['trust_score'])
+    fig.add_trace(go.Scatter(x=mean_x, y=mean_y, text=names, customdata=counts, mode='markers', name='District mean',
+                             marker=dict(size=9, color='orange', line=dict(width=1, color='black')),
+                             hovertemplate='%{text}: %{customdata} responses<extra></extra>'))
+    fig.update_layout(title=f'Sentiment vs Trust ({len(df)} responses)',
+                      xaxis_title='overall_score', yaxis_title='trust_score')
+    return fig
+
+def justice_index_figure(df):
+    if chart_data.use_raw(len(df)):
+        return px.bar(df,x='district',y='justice_index',color='justice_index',title='Justice Index by District')
+    summary = chart_data.group_summary(df['district'], df['justice_index'])
+    fig = go.Figure(go.Bar(x=summary['district'], y=summary['mean'], customdata=summary['count'], name='Mean',
+                           marker=dict(color=summary['mean'], colorscale='Plasma', colorbar=dict(title='justice_index')),
+                           hovertemplate='%{x}: mean %{y:.2f} over %{customdata} responses<extra></extra>'))
+    fig.add_trace(go.Box(x=summary['district'], lowerfence=summary[0.05], q1=summary[0.25], median=summary[0.5],
+                         q3=summary[0.75], upperfence=summary[0.95], mean=summary['mean'],
+                         name='Distribution (5th-95th percentile)', marker_color='black', fillcolor='rgba(0,0,0,0)'))
+    fig.update_layout(title=f'Justice Index by District ({len(df)} responses)', showlegend=False)
+    return fig
+
+
+def pooled_mean(stats, column):
+    # Mean over all feedback rows from the per-district running sums
+    count = stats[f'{column}_count'].sum() if not stats.empty else 0
+    return stats[f'{column}_sum'].sum() / count if count else 0
+
+
 # ----------- MAIN RENDER FUNCTION ----------
-def render_dashboard(df):
+def build_dashboard(df, district=None):
 
     if df.empty:
         df = pd.DataFrame(columns=['district','trust_score','responsiveness_score','community_justice_score','suggestions','overall_score'])
 
-    total_feedbacks = len(df)
-    avg_sentiment = df['overall_score'].mean() if total_feedbacks>0 else 0
-    positive_pct = len(df[df['overall_score']>3]) / total_feedbacks * 100 if total_feedbacks>0 else 0
-    avg_trust = df['trust_score'].mean() if 'trust_score' in df else 0
-    most_mentioned_district = df['district'].mode()[0] if total_feedbacks>0 else "N/A"
-    districts = fetch_feedback()['district'].dropna().unique().tolist()
-
-    df['sentiment']=np.select([(df['overall_score']>=4),(df['overall_score']<=2)],['Positive','Negative'],default='Neutral')
-    pie_html = px.pie(df,names='sentiment',title='Sentiment Breakdown',
-                     color='sentiment',color_discrete_map={'Positive':'green','Neutral':'yellow','Negative':'red'}).to_html(full_html=False)
-
-    radar_df=df.groupby('district')[['trust_score','responsiveness_score','community_justice_score']].mean().reset_index()
-    radar_fig=go.Figure()
-    for _,row in radar_df.iterrows():
-        radar_fig.add_trace(go.Scatterpolar(r=[row['trust_score'],row['responsiveness_score'],row['community_justice_score']],
-                                            theta=['Trust','Responsiveness','Community'],fill='toself',name=row['district']))
-    radar_fig.update_layout(polar=dict(radialaxis=dict(visible=True,range=[0,5])),showlegend=True)
-    radar_html=radar_fig.to_html(full_html=False)
-
-    bar_html=px.bar(df.groupby('district')[['trust_score']].mean().reset_index(),
-                    x='district',y='trust_score',title='Trust Score by District').to_html(full_html=False)
-
-    if 'created_at' in df.columns:
-        df['month']=pd.to_datetime(df['created_at']).dt.to_period('M')
-        line_html=px.line(df.groupby('month')['overall_score'].mean().reset_index(),
-                          x='month',y='overall_score',title='Sentiment Trend Over Time').to_html(full_html=False)
-    else:
-        line_html="<p>No date field</p>"
+    # Aggregates come from the rollup tables, not from scanning the feedback rows
+    with metrics.timed("lawbot_query_seconds", query="district_stats"):
+        stats = pd.DataFrame(rollups.district_stats(district))
+    if stats.empty:
+        stats = pd.DataFrame(columns=['district','feedback_count','above_three_count','positive_count','negative_count']
+                             + [f'{c}{part}' for c in rollups.SCORE_COLUMNS for part in ('','_sum','_count')])
+    named = stats[stats['district']!=rollups.NO_DISTRICT].sort_values('district')
 
-    wc_img=create_wordcloud(' '.join(df['suggestions'].dropna().astype(str)))
+    total_feedbacks = int(stats['feedback_count'].sum())
+    avg_sentiment = pooled_mean(stats,'overall_score') if total_feedbacks>0 else 0
+    positive_pct = stats['above_three_count'].sum() / total_feedbacks * 100 if total_feedbacks>0 else 0
+    avg_trust = pooled_mean(stats,'trust_score')
+    most_mentioned_district = named.sort_values(['feedback_count','district'],ascending=[False,True])['district'].iloc[0] if not named.empty else "N/A"
+
+    positive, negative = int(stats['positive_count'].sum()), int(stats['negative_count'].sum())
+    sentiment_df = pd.DataFrame({'sentiment':['Positive','Neutral','Negative'],
+                                 'count':[positive,total_feedbacks-positive-negative,negative]})
+    figures = {}
+    with metrics.timed("lawbot_chart_seconds", chart="pie"):
+        figures['pie'] = figure_json(px.pie(sentiment_df[sentiment_df['count']>0],names='sentiment',values='count',title='Sentiment Breakdown',
+                         color='sentiment',color_discrete_map={'Positive':'green','Neutral':'yellow','Negative':'red'}))
+
+    with metrics.timed("lawbot_chart_seconds", chart="radar"):
+        radar_df=named[['district','trust_score','responsiveness_score','community_justice_score']]
+        radar_fig=go.Figure()
+        for _,row in radar_df.iterrows():
+            radar_fig.add_trace(go.Scatterpolar(r=[row['trust_score'],row['responsiveness_score'],row['community_justice_score']],
+                                                theta=['Trust','Responsiveness','Community'],fill='toself',name=row['district']))
+        radar_fig.update_layout(polar=dict(radialaxis=dict(visible=True,range=[0,5])),showlegend=True)
+        figures['radar']=figure_json(radar_fig)
+
+    with metrics.timed("lawbot_chart_seconds", chart="trust_bar"):
+        figures['trust_bar']=figure_json(px.bar(named[['district','trust_score']],
+                                                x='district',y='trust_score',title='Trust Score by District'))
+
+    with metrics.timed("lawbot_chart_seconds", chart="trend_line"):
+        monthly = rollups.monthly_overall(district)
+        if monthly:
+            figures['trend_line']=figure_json(px.line(pd.DataFrame(monthly,columns=['month','overall_score']),
+                                                      x='month',y='overall_score',title='Sentiment Trend Over Time'))
+
+    with metrics.timed("lawbot_query_seconds", query="top_terms"):
+        frequencies = dict(term_index.top_terms(district, n=200))
+    wc_img=create_wordcloud(frequencies)
     corr_img=create_corr_heatmap(df)
-    scatter_html=px.scatter(df,x='overall_score',y='trust_score',color='district',title='Sentiment vs Trust').to_html(full_html=False)
+    with metrics.timed("lawbot_chart_seconds", chart="scatter"):
+        figures['scatter']=figure_json(scatter_figure(df))
+
+    with metrics.timed("lawbot_chart_seconds", chart="justice_index"):
+        df['justice_index']=0.4*df['trust_score']+0.3*df['responsiveness_score']+0.3*df['community_justice_score']
+        figures['justice_index']=figure_json(justice_index_figure(df))
+
+    return dict(total_feedbacks=total_feedbacks,avg_sentiment=float(avg_sentiment),
+                positive_pct=float(positive_pct),avg_trust=float(avg_trust),
+                most_mentioned_district=most_mentioned_district,
+                wc_img=wc_img,corr_img=corr_img,figures=figures)
 
-    df['justice_index']=0.4*df['trust_score']+0.3*df['responsiveness_score']+0.3*df['community_justice_score']
-    index_html=px.bar(df,x='district',y='justice_index',color='justice_index',title='Justice Index by District').to_html(full_html=False)
+def render_dashboard(df, district=None):
+    fragments = build_dashboard(df, district)
+    return render_template('dashboard.html',districts=feedback_queries.district_names(),
+                           **fragments, **chart_fragments(fragments['figures'], district))
 
-    return render_template('dashboard.html',
-                           total_feedbacks=total_feedbacks,avg_sentiment=avg_sentiment,
-                           positive_pct=positive_pct,avg_trust=avg_trust,
-                           most_mentioned_district=most_mentioned_district,
-                           pie_html=pie_html,radar_html=radar_html,bar_html=bar_html,
-                           line_html=line_html,wc_img=wc_img,corr_img=corr_img,
-                           scatter_html=scatter_html,index_html=index_html,
-                           districts=districts)
+def dashboard_fragments(district=None):
+    version = cache_version()
+    fragments = fragment_cache.get(district, version)
+    if fragments is None:
+        fragments = build_dashboard(fetch_feedback(district), district)
+        # Only cache real districts, so arbitrary /<district> paths can't fill the cache
+        if district is None or district in feedback_queries.district_names():
+            fragment_cache.put(district, version, fragments)
+    return fragments
+
+def render_cached_dashboard(district=None):
+    fragments = dashboard_fragments(district)
+    return render_template('dashboard.html',districts=feedback_queries.district_names(),
+                           **fragments, **chart_fragments(fragments['figures'], district))
 
 
 # ------------ ROUTES -------------
 @app.route('/')
 def dashboard():
-    df = fetch_feedback()
-    return render_dashboard(df)
+    return render_cached_dashboard()
 
 @app.route("/<district>")
 def filter_district(district):
-    df = fetch_feedback()
-    df2 = df[df['district']==district]
-    return render_dashboard(df2)
+    return render_cached_dashboard(district)
+
+@app.route("/api/top_terms")
+def top_terms():
+    district = request.args.get("district")
+    n = max(1, min(request.args.get("n", 50, type=int), 1000))  # LIMIT 0 / -1 is a MySQL syntax error
+    return jsonify([{"term": term, "count": count} for term, count in term_index.top_terms(district, n)])
+
+@app.route("/api/chart/<name>")
+def chart_json(name):
+    # One chart's figure JSON, for LAWBOT_PLOTLY_MODE=lazy pages or other front ends
+    district = request.args.get("district") or None
+    if name not in CHART_FIELDS or (district is not None and district not in feedback_queries.district_names()):
+        abort(404)
+    figure = dashboard_fragments(district)['figures'].get(name)
+    if figure is None:
+        abort(404)
+    response = Response(figure, mimetype="application/json")
+    response.set_etag(hashlib.sha1(figure.encode("utf-8")).hexdigest()[:16])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+EXPORT_FORMATS = {"ndjson": ("application/x-ndjson", answers.ndjson_lines),
+                  "csv": ("text/csv", answers.csv_lines)}
+
+@app.route("/api/answers/export")
+def export_answers():
+    # Every recorded chat answer, streamed: memory use does not grow with the row count.
+    # ?format=ndjson|csv &source= &district= &start= &end= (created_at) &after_id= (resume)
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    filters = {k: request.args.get(k) for k in ("source", "district", "start", "end")}
+    filters["after_id"] = request.args.get("after_id", type=int)
+    if filters["source"] is not None and filters["source"] not in answers.SOURCES:
+        abort(400)
+    mimetype, lines = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(lines(answers.export_chunks(**filters))), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=feedback_answers.{fmt}"
+    return response
+
+HEATMAP_STATE = "Tamil Nadu"
+_tile_versions = {}
+
+def tile_version(path):
+    # Content hash, recomputed whenever tile_path() rewrites the file
+    key = (path, os.stat(path).st_mtime_ns)
+    version = _tile_versions.get(key)
+    if version is None:
+        with open(path, 'rb') as f:
+            version = _tile_versions[key] = hashlib.sha1(f.read()).hexdigest()[:12]
+    return version
+
+def tile_url(state):
+    # Content-hashed URL, so the tile can be cached by browsers indefinitely
+    path = geo_tiles.tile_path(state)
+    return url_for('geo_tile', slug=geo_tiles.state_slug(state), v=tile_version(path))
+
+def send_precompressed(path, mimetype, download_name, immutable):
+    # Serve the .br / .gz sibling the client accepts, with long-lived cache headers
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = next((e for e, suffix in (('br', '.br'), ('gzip', '.gz'))
+                     if e in accepted and os.path.exists(path + suffix)), None)
+    response = send_file(path + {'br': '.br', 'gzip': '.gz'}.get(encoding, ''),
+                         mimetype=mimetype, download_name=download_name,
+                         conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+@app.route("/geo/<slug>.topo.json")
+def geo_tile(slug):
+    path = os.path.join(geo_tiles.OUTPUT_DIR, slug + ".topo.json")
+    if slug == geo_tiles.state_slug(HEATMAP_STATE):
+        path = geo_tiles.tile_path(HEATMAP_STATE)
+    if not os.path.exists(path):
+        abort(404)
+    # immutable only under the URL of the current content; a missing or old ?v= revalidates
+    current = request.args.get('v') == tile_version(path)
+    response = send_precompressed(path, 'application/json', slug + '.topo.json', current)
+    if not current:
+        response.cache_control.no_cache = True
+    return response
+
+@app.route("/assets/<filename>")
+def asset(filename):
+    # plotly.js; the file name carries the plotly version, so it never changes in place
+    path = os.path.join(ASSET_DIR, os.path.basename(filename))
+    if not filename.endswith(".js") or not os.path.exists(path):
+        abort(404)
+    return send_precompressed(path, 'text/javascript', filename, True)
 
 @app.route("/tamil_heatmap")
 def tamil_heatmap():
-    df = fetch_feedback()
-    counts = df.groupby('district')['overall_score'].mean().to_dict()
-    return render_template("tamil_heatmap.html", counts=counts)
+    counts = rollups.district_means('overall_score')
+    # keyed_counts uses the same normalized keys as the tile's geometry properties.key
+    return render_template("tamil_heatmap.html", counts=counts, keyed_counts=geo_tiles.keyed_counts(counts),
+                           geo_url=tile_url(HEATMAP_STATE))
+
+
+@app.route("/healthz")
+def healthz():
+    # Liveness / readiness probe: touches the database, never the chart libraries
+    try:
+        db.fetchall("SELECT 1")
+    except Exception as err:
+        return jsonify({"status": "error", "error": str(err)}), 503
+    return jsonify({"status": "ok", "charts_loaded": lazy_imports.loaded()})
+
+
+# ------------ WARMUP -------------
+def warmup():
+    # Pre-fork hook: import the chart stack and render throwaway charts once in the
+    # parent (e.g. from gunicorn --preload), so forked workers share the loaded
+    # modules, plotly templates and matplotlib font cache instead of each paying for them
+    lazy_imports.load_all()
+    figure_json(px.bar(x=[0], y=[0]))
+    plotly_asset()
+    create_corr_heatmap(pd.DataFrame({'a': [1.0, 2.0], 'b': [2.0, 1.0]}))
+    create_wordcloud({'warmup': 1})
+    return dict(lazy_imports.import_times)
+
+if os.environ.get("LAWBOT_PRELOAD_CHARTS") == "1":
+    warmup()
+
+# Optionally keep the columnar snapshot current from this process every N seconds
+# (or run python feedback_snapshot.py --watch N next to the app instead)
+_snapshot_interval = float(os.environ.get("LAWBOT_SNAPSHOT_REFRESH", "0"))
+if _snapshot_interval > 0:
+    feedback_snapshot.start_refresher(_snapshot_interval, ("justice_feedback",))
+
+# Optionally re-render stale cached pages in the background every N seconds
+_refresh_interval = float(os.environ.get("LAWBOT_CHART_REFRESH", "0"))
+if _refresh_interval > 0:
+    chart_cache.start_refresher(fragment_cache, cache_version,
+                                lambda district: build_dashboard(fetch_feedback(district), district),
+                                _refresh_interval)
 
 
 if __name__ == '__main__':
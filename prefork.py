@@ -0,0 +1,237 @@
+import argparse
+import gc
+import importlib
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+# Preload-and-fork server for app.py, project.py, powerbiapp.py and load_data.py.
+# The parent imports the app and runs its warmup() (polarity lexicon, keyword
+# and FAQ indexes, translated questions, chart stack), then forks N workers that
+# share all of that copy-on-write. Each worker serves the inherited listening
+# socket with werkzeug's threaded server, opens its own database connections,
+# and is replaced after --max-requests requests (plus random jitter) or when it dies.
+#
+#   python prefork.py app --workers 4 --port 5000
+#   python prefork.py powerbiapp --workers 8 --max-requests 5000
+#
+# GET /readyz answers 200 once a worker has finished starting and can reach the
+# database. SIGTERM / SIGINT stop the workers gracefully; SIGHUP recycles them.
+#
+# Modules holding threads or connections that must not cross a fork register
+# hooks here: before() runs in the parent just before the first fork (in reverse
+# registration order, so writers flush before the pool closes), after(worker)
+# runs in every new worker.
+
+WORKERS = int(os.environ.get("LAWBOT_WORKERS", "0")) or os.cpu_count() or 1
+MAX_REQUESTS = int(os.environ.get("LAWBOT_MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.environ.get("LAWBOT_MAX_REQUESTS_JITTER", "0"))
+GRACEFUL_TIMEOUT = float(os.environ.get("LAWBOT_GRACEFUL_TIMEOUT", "30"))
+
+worker_id = None  # 1..N inside a worker, None in the parent / without the launcher
+_hooks = []
+
+
+# ------------------ Fork hooks ------------------
+def register(before=None, after=None):
+    _hooks.append((before, after))
+
+def run_before_fork():
+    for before, _ in reversed(_hooks):
+        if before is not None:
+            before()
+
+def run_after_fork(worker):
+    global worker_id
+    worker_id = worker
+    for _, after in list(_hooks):
+        if after is not None:
+            after(worker)
+
+def start_thread(target, name):
+    # Daemon thread running target(stop_event); under the launcher it is stopped in
+    # the parent and started afresh in each worker. Returns a function that stops it.
+    current = {}
+
+    def start(worker=None):
+        stop = current["stop"] = threading.Event()
+        thread = current["thread"] = threading.Thread(target=target, args=(stop,), name=name, daemon=True)
+        thread.start()
+
+    def stop_and_wait():
+        # Let a pass that is under way finish, so no pool connection or file lock it
+        # holds is inherited by the workers
+        current["stop"].set()
+        current["thread"].join()
+
+    start()
+    register(before=stop_and_wait, after=start)
+    return lambda: current["stop"].set()
+
+
+# ------------------ Worker ------------------
+_status = {"ready": False, "requests": 0, "in_flight": 0, "started": time.time(), "warmup_seconds": 0.0}
+_status_lock = threading.Lock()
+
+def memory():
+    # Resident and private (unshared) memory of this process in MB, from /proc on Linux
+    sizes = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    sizes[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {"rss_mb": round(sizes.get("Rss", 0), 1), "pss_mb": round(sizes.get("Pss", 0), 1),
+            "private_mb": round(sizes.get("Private_Clean", 0) + sizes.get("Private_Dirty", 0), 1)}
+
+def install(app):
+    # /readyz: warm and able to reach the database
+    from flask import jsonify
+    import db
+
+    def readyz():
+        status = dict(_status, worker=worker_id, pid=os.getpid(), uptime=round(time.time() - _status["started"], 1),
+                      **memory())
+        if not status.pop("ready"):
+            return jsonify(dict(status, status="starting")), 503
+        try:
+            db.fetchall("SELECT 1")
+        except Exception as err:
+            return jsonify(dict(status, status="error", error=str(err))), 503
+        return jsonify(dict(status, status="ok"))
+    app.add_url_rule("/readyz", "readyz", readyz)
+
+def _counting(app, max_requests, shutdown):
+    # WSGI wrapper: tracks requests in flight and asks for a recycle after max_requests
+    def wrapper(environ, start_response):
+        with _status_lock:
+            _status["requests"] += 1
+            _status["in_flight"] += 1
+            if max_requests and _status["requests"] == max_requests:
+                shutdown()
+        try:
+            return app(environ, start_response)
+        finally:
+            with _status_lock:
+                _status["in_flight"] -= 1
+    return wrapper
+
+def run_worker(app, sock, worker, max_requests):
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # replaced by a graceful shutdown once serving
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the parent sends SIGTERM
+    run_after_fork(worker)
+    host, port = sock.getsockname()[:2]
+    server = None
+
+    def shutdown():
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    server = make_server(host, port, _counting(app, max_requests, shutdown), threaded=True, fd=sock.fileno())
+    signal.signal(signal.SIGTERM, lambda *_: shutdown())
+    _status["started"] = time.time()
+    _status["ready"] = True
+    server.serve_forever()
+
+    deadline = time.monotonic() + GRACEFUL_TIMEOUT
+    while _status["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return 0
+
+
+# ------------------ Parent ------------------
+def preload(target):
+    # "module" or "module:attribute"; imports the app and runs module.warmup() if it has one
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name)
+    app = getattr(module, attribute or "app")
+    start = time.perf_counter()
+    warmup = getattr(module, "warmup", None)
+    if warmup is not None:
+        warmup()
+    _status["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    install(app)
+    return app
+
+def serve(target, host="127.0.0.1", port=5000, workers=WORKERS, max_requests=MAX_REQUESTS,
+          jitter=MAX_REQUESTS_JITTER):
+    app = preload(target)
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+
+    run_before_fork()
+    gc.collect()
+    gc.freeze()  # preloaded objects leave the collector's lists, so workers don't dirty their pages
+
+    parent = os.getpid()
+    children = {}  # pid -> (worker number, started at)
+    state = {"stopping": False}
+
+    def spawn(worker):
+        pid = os.fork()
+        if pid == 0:
+            limit = max_requests + random.randint(0, jitter) if max_requests else 0
+            sys.exit(run_worker(app, sock, worker, limit))
+        children[pid] = (worker, time.monotonic())
+
+    def stop(*_):
+        state["stopping"] = True
+        for pid in list(children):
+            _signal(pid, signal.SIGTERM)
+
+    def recycle(*_):
+        for pid in list(children):
+            _signal(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, recycle)
+    print(f"prefork: {target} on http://{host}:{port} with {workers} workers "
+          f"(warmup {_status['warmup_seconds']}s)", flush=True)
+    for worker in range(1, workers + 1):
+        spawn(worker)
+
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            worker, started = children.pop(pid, (None, 0.0))
+            if worker is None or state["stopping"]:
+                continue
+            if time.monotonic() - started < 1.0:
+                time.sleep(1.0)  # crashing on start: don't spin
+            spawn(worker)
+    finally:
+        if os.getpid() == parent:
+            stop()
+            sock.close()
+
+def _signal(pid, sig):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preload an app, then serve it from forked workers")
+    parser.add_argument("target", help="app module (app, project, powerbiapp, load_data) or module:attribute")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS, help="recycle a worker after N requests")
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    args = parser.parse_args()
+    import prefork  # the apps register their hooks with the importable module, not this __main__ copy
+    prefork.serve(args.target, args.host, args.port, args.workers, args.max_requests, args.max_requests_jitter)
@@ -1,37 +1,57 @@
 from flask import Flask, render_template, request, jsonify
-from textblob import TextBlob
 from googletrans import Translator
-import mysql.connector
 import random
+import answers
+import db
+import faq
+import feedback_queries
+import metrics
+import rollups
+import term_index
+from feedback_writer import FeedbackWriter
+import scoring
+import sessions
+import translation
 
 app = Flask(__name__)
-translator = Translator()
-
-# MySQL connection
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="chatbot_db"
-)
-cursor = conn.cursor()
+# googletrans behind a concurrency limit, deadlines and a circuit breaker
+gateway = translation.TranslationGateway(Translator())
+translator = translation.CachedTranslator(gateway)
+pipeline = translation.TranslationPipeline(translator)
+session_store = sessions.store_from_env()
+fact_index = faq.FactIndex()
 
 # Create table
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS justice_feedback (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    district VARCHAR(255),
-    trust_score FLOAT,
-    responsiveness_score FLOAT,
-    fairness_score FLOAT,
-    accessibility_score FLOAT,
-    corruption_score FLOAT,
-    community_justice_score FLOAT,
-    suggestions TEXT,
-    justice_sentiment VARCHAR(50),
-    overall_score FLOAT
-)
-""")
+db.execute(feedback_queries.JUSTICE_FEEDBACK_DDL)
+
+# Completed sessions are inserted in batches by a background writer
+INSERT_FEEDBACK = """
+    INSERT INTO justice_feedback (
+        district, trust_score, responsiveness_score, fairness_score,
+        accessibility_score, corruption_score, community_justice_score,
+        suggestions, justice_sentiment, overall_score, session_key
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+def update_rollups(cur, rows):
+    rollups.record_justice_feedback(cur, rows)
+    term_index.record_suggestions(cur, rows)
+
+rollups.ensure_tables()
+term_index.ensure_tables()
+answers.ensure_tables("justice_feedback")
+feedback_writer = FeedbackWriter(INSERT_FEEDBACK, spool_path="justice_feedback.spool",
+                                 after_write=update_rollups).start()
+# Every scored turn, with its answer text (for re-scoring and export)
+answer_writer = FeedbackWriter(answers.INSERT_ANSWER, spool_path="justice_answers.spool").start()
+
+# /metrics: request, translation, scoring and insert timings plus pool / cache / writer stats
+metrics.install(app)
+metrics.register_gauges("lawbot_db_pool", db.stats)
+metrics.register_gauges("lawbot_feedback_writer", lambda: feedback_writer.stats, writer=feedback_writer.name)
+metrics.register_gauges("lawbot_feedback_writer", lambda: answer_writer.stats, writer=answer_writer.name)
+metrics.register_gauges("lawbot_translator", translator.stats)
+metrics.register_gauges("lawbot_translation_pipeline", pipeline.stats)
+metrics.register_gauges("lawbot_translate_gateway", gateway.stats)
 
 # Justice-related questions (10+ for interactive chat)
 justice_questions = {
@@ -49,18 +69,7 @@ justice_questions = {
 }
 
 # Keywords for scoring
-keywords_dict = {
-    "trust": ["trust", "honest", "reliable", "transparent"],
-    "responsiveness": ["fast", "responsive", "quick", "helpful"],
-    "fairness": ["fair", "unfair", "bias", "impartial", "justice"],
-    "accessibility": ["access", "reachable", "available", "easy", "helpful"],
-    "corruption": ["corrupt", "bribe", "unfair", "illegal", "fraud"],
-    "community_justice": ["community", "local", "participation", "resolve", "fair"],
-    "timely_resolution": ["timely", "delay", "slow", "efficient", "quick"],
-    "legal_awareness": ["aware", "knowledge", "rights", "inform", "understand"],
-    "support_services": ["aid", "support", "counsel", "assistance", "help"],
-    "police_cooperation": ["police", "cooperate", "helpful", "support"]
-}
+keywords_dict = scoring.JUSTICE_KEYWORDS
 
 # References / Suggested Reading
 justice_references = [
@@ -73,45 +82,42 @@ justice_references = [
 ]
 
 # NLP scoring
+keyword_index = scoring.build_keyword_index(keywords_dict)
+
 def keyword_score(text, category):
-    words = text.lower().split()
-    matches = sum(word in words for word in keywords_dict.get(category, []))
-    return min(matches + 1, 5)
+    return scoring.keyword_score(text, category, keyword_index)
 
+@metrics.timed("lawbot_score_seconds")
 def analyze_score(text, category):
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity <= -0.6: polarity_score = 1
-    elif polarity <= -0.2: polarity_score = 2
-    elif polarity <= 0.2: polarity_score = 3
-    elif polarity <= 0.6: polarity_score = 4
-    else: polarity_score = 5
-    k_score = keyword_score(text, category)
-    return round((polarity_score + k_score) / 2, 2)
+    return scoring.score_answer(text, category, keyword_index).score
 
 def analyze_sentiment(text):
-    polarity = TextBlob(text).sentiment.polarity
-    if polarity > 0.1: return "positive"
-    elif polarity < -0.1: return "negative"
-    else: return "neutral"
+    return scoring.sentiment_label(scoring.polarity_of(text))
 
-def select_next_category(scores_dict):
-    unanswered = [k for k, v in scores_dict.items() if v is None]
+def select_next_category(scores_dict, answered=None):
+    unanswered = [k for k, v in scores_dict.items() if v is None and k != answered]
     return random.choice(unanswered) if unanswered else None
 
 # Translation
-def translate_to_english(text):
-    detected = translator.detect(text)
-    if detected.lang != 'en':
-        translated = translator.translate(text, src=detected.lang, dest='en')
-        return translated.text, detected.lang
+@metrics.timed("lawbot_translation_seconds", direction="to_english")
+def translate_to_english(text, lang=None):
+    # lang: already detected by the caller (detect once per answer, so detector stats count it once)
+    lang = lang or translator.detect(text)
+    if lang != 'en':
+        return pipeline.translate(text, lang, 'en'), lang
     return text, 'en'
 
-def translate_to_user_language(text, lang):
+@metrics.timed("lawbot_translation_seconds", direction="to_user")
+def translate_to_user_language(text, lang, pending=None):
+    # pending: a future from pipeline.submit() started earlier for the same text
     if lang != 'en':
-        translated = translator.translate(text, src='en', dest=lang)
-        return translated.text
+        return pipeline.result(pending or pipeline.submit(text, 'en', lang), fallback=text)
     return text
 
+# Questions are fixed strings: translate them up front for every language seen so far
+translator.set_warm_texts(justice_questions.values())
+translator.prewarm()
+
 # Routes
 @app.route("/")
 def index():
@@ -120,12 +126,15 @@ def index():
 @app.route("/start_chat", methods=["POST"])
 def start_chat():
     district = request.form.get("district")
+    if answers.too_long(district=district):
+        return jsonify({"error": "District name is too long."}), 400
     session_data = {
         "district": district,
         "justice_scores": {k: None for k in justice_questions.keys()},
         "trust_responsiveness_scores": {"trust": None, "responsiveness": None},
         "chat_history": [],
-        "user_lang": "en"
+        "user_lang": "en",
+        "session_key": answers.new_session_key()
     }
     first_cat = select_next_category(session_data["justice_scores"])
     question = justice_questions[first_cat]
@@ -133,28 +142,54 @@ def start_chat():
         "message": f"Hello! Let's start your justice feedback for {district}.",
         "question": question,
         "category": first_cat,
-        "session": session_data
+        **sessions.client_payload(session_store, session_data)
     })
 
 @app.route("/next_question", methods=["POST"])
 def next_question():
     data = request.json
-    session_data = data["session"]
+    session_data = sessions.load(session_store, data)
+    if session_data is None:
+        return jsonify({"error": "Session expired. Please start a new chat."}), 404
     last_answer = data.get("answer")
     last_category = data.get("category")
+    if answers.too_long(district=session_data.get("district"), category=last_category):
+        return jsonify({"error": "Category name is too long."}), 400
     bot_reply = ""
+    next_cat = prefetched = None
 
     if last_answer and last_category:
-        user_text, user_lang = translate_to_english(last_answer)
+        answer_lang = translator.detect(last_answer)
+        if pipeline.executor:
+            # Start translating the next question while the answer is translated and scored
+            next_cat = select_next_category(session_data["justice_scores"], answered=last_category)
+            if next_cat:
+                prefetched = pipeline.submit(justice_questions[next_cat], 'en', answer_lang)
+        user_text, user_lang = translate_to_english(last_answer, answer_lang)
         session_data["user_lang"] = user_lang
-        score = analyze_score(user_text, last_category)
-        sentiment = analyze_sentiment(user_text)
+
+        repeat = justice_questions.get(last_category)
+        fact = fact_index.answer(user_text, session_data["district"]) if repeat else None
+        if fact is not None:
+            # A factual question rather than an answer: reply, then ask the same question again
+            metrics.inc("lawbot_faq_answers_total")
+            return jsonify({
+                "bot_reply": translate_to_user_language(fact, user_lang),
+                "question": translate_to_user_language(repeat, user_lang),
+                "category": last_category,
+                **sessions.client_payload(session_store, session_data)
+            })
+
+        with metrics.timed("lawbot_score_seconds"):
+            score, _, sentiment = scoring.score_answer(user_text, last_category, keyword_index)
         session_data["chat_history"].append({
             "category": last_category,
             "answer": last_answer,
             "score": score,
             "sentiment": sentiment
         })
+        answer_writer.submit((answers.session_key(session_data), "justice_feedback", session_data["district"],
+                              last_category, last_answer, user_text, score, sentiment))
 
         session_data["justice_scores"][last_category] = score
         if last_category in ["trust", "responsiveness"]:
@@ -164,19 +199,18 @@ def next_question():
 
     # Select next question
     if None in session_data["justice_scores"].values():
-        next_cat = select_next_category(session_data["justice_scores"])
+        next_cat = next_cat or select_next_category(session_data["justice_scores"])
         question = justice_questions[next_cat]
     else:
         # Calculate scores
         trust_score = session_data["trust_responsiveness_scores"]["trust"]
         responsiveness_score = session_data["trust_responsiveness_scores"]["responsiveness"]
-        j_scores = [v for k,v in session_data["justice_scores"].items() if k not in ["trust", "responsiveness", "justice_suggestions"]]
         fairness_score = session_data["justice_scores"].get("fairness",0)
         accessibility_score = session_data["justice_scores"].get("accessibility",0)
         corruption_score = session_data["justice_scores"].get("corruption",0)
         community_score = session_data["justice_scores"].get("community_justice",0)
 
-        overall_score = round(sum([v for v in [trust_score,responsiveness_score]+j_scores if v is not None])/len([v for v in [trust_score,responsiveness_score]+j_scores if v is not None]),2)
+        overall_score = answers.justice_overall(session_data["justice_scores"])
 
         suggestions = ""
         for entry in session_data["chat_history"]:
@@ -184,18 +218,12 @@ def next_question():
                 suggestions = entry["answer"]
 
         # Save to DB
-        cursor.execute("""
-            INSERT INTO justice_feedback (
-                district, trust_score, responsiveness_score, fairness_score,
-                accessibility_score, corruption_score, community_justice_score,
-                suggestions, justice_sentiment, overall_score
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (
+        feedback_writer.submit((
             session_data["district"], trust_score, responsiveness_score, fairness_score,
             accessibility_score, corruption_score, community_score,
-            suggestions, "N/A", overall_score
+            suggestions, "N/A", overall_score, answers.session_key(session_data)
         ))
-        conn.commit()
+        sessions.discard(session_store, session_data)
 
         return jsonify({
             "bot_reply": bot_reply,
@@ -204,13 +232,20 @@ def next_question():
             "references": justice_references
         })
 
-    question_translated = translate_to_user_language(question, session_data["user_lang"])
+    question_translated = translate_to_user_language(question, session_data["user_lang"], prefetched)
     return jsonify({
         "bot_reply": bot_reply,
         "question": question_translated,
         "category": next_cat,
-        "session": session_data
+        **sessions.client_payload(session_store, session_data)
     })
 
+# Pre-fork hook (prefork.py): load the polarity lexicon and translate the question
+# texts in the parent; keyword and FAQ indexes are already built at import
+def warmup():
+    scoring.polarity_of("warm up")
+    fact_index.answer("what is the helpline number?")
+    translator.prewarm(background=False)
+
 if __name__ == "__main__":
     app.run(debug=True)
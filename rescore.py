@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import answers
+import db
+import feedback_snapshot
+import language_detect
+import rollups
+import scoring
+
+# Offline re-scoring of stored answers after keywords or polarity thresholds change.
+# feedback_answers is streamed in id order through a server-side cursor; each
+# chunk is scored in a worker process with scoring.score_batch, changed answers
+# are written back with batched UPDATEs, and the district_feedback /
+# justice_feedback rows of the sessions they belong to are recomputed from their
+# answers in the same transaction. The last committed id is checkpointed, so an
+# interrupted run picks up where it stopped.
+#
+# The English text the chat scored (answer_en) is what gets re-scored. Answers
+# stored before that column existed are re-scored only if the original is
+# confidently English; the rest are skipped rather than scored untranslated.
+#
+#   python rescore.py --dry-run      report what would change, write nothing
+#   python rescore.py                re-score (resuming an interrupted run)
+#   python rescore.py --restart      ignore the checkpoint
+#   options: --source district_feedback|justice_feedback, --chunk-size N, --workers N
+
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rescore.checkpoint.json")
+CHUNK_SIZE = 5000
+SESSION_BATCH = 500
+SAMPLE_SIZE = 10
+
+KEYWORD_INDEXES = {
+    "district_feedback": scoring.build_keyword_index(scoring.DISTRICT_KEYWORDS),
+    "justice_feedback": scoring.build_keyword_index(scoring.JUSTICE_KEYWORDS),
+}
+
+SELECT_ANSWERS = ("SELECT id, session_key, source, category, answer, answer_en, score, sentiment "
+                  "FROM feedback_answers WHERE id > %s")
+UPDATE_ANSWER = "UPDATE feedback_answers SET score = %s, sentiment = %s WHERE id = %s"
+
+_district_columns = [f"{c}_score" for c in answers.DISTRICT_SCORE_CATEGORIES] + [
+    "sentiment_score", "justice_score", "justice_sentiment", "overall_score"]
+_justice_columns = [f"{c}_score" for c in answers.JUSTICE_SCORE_CATEGORIES] + ["overall_score"]
+UPDATE_FEEDBACK = {
+    "district_feedback": "UPDATE district_feedback SET " + ", ".join(f"{c} = %s" for c in _district_columns)
+                         + " WHERE session_key = %s",
+    "justice_feedback": "UPDATE justice_feedback SET " + ", ".join(f"{c} = %s" for c in _justice_columns)
+                        + " WHERE session_key = %s",
+}
+
+
+# ------------------ Scoring (worker processes) ------------------
+def score_chunk(rows):
+    # [(id, source, category, answer)] -> [(id, score, sentiment)]
+    by_source = {}
+    for row in rows:
+        by_source.setdefault(row[1], []).append(row)
+    results = []
+    for source, group in by_source.items():
+        scores = scoring.score_batch([r[3] for r in group], [r[2] for r in group], KEYWORD_INDEXES[source])
+        results.extend((r[0], s.score, s.sentiment) for r, s in zip(group, scores))
+    return results
+
+def scored_text(row):
+    # The text the chat scored, or None when it can't be recovered
+    if row["answer_en"] is not None:
+        return row["answer_en"]
+    lang, confidence = language_detect.detect(row["answer"] or "")
+    return row["answer"] if lang == "en" and confidence >= language_detect.MIN_CONFIDENCE else None
+
+def _work(chunk):
+    work = []
+    for r in chunk:
+        text = scored_text(r)
+        if text is not None:
+            work.append((r["id"], r["source"], r["category"], text))
+    return work
+
+def scored_chunks(chunks, workers):
+    # (chunk, scores) in stream order, scoring up to two chunks per worker ahead
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, score_chunk(_work(chunk))
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(score_chunk, _work(chunk))))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+# ------------------ Feedback rows ------------------
+def district_row(turns):
+    # turns: {category: (score, sentiment)} for one app.py session
+    district_scores = {c: turns[c][0] if c in turns else None for c in answers.DISTRICT_SCORE_CATEGORIES}
+    justice_scores = {c: turns[c][0] for c in answers.DISTRICT_JUSTICE_CATEGORIES if c in turns}
+    history = [{"category": c, "sentiment": sentiment} for c, (_, sentiment) in turns.items()]
+    return tuple(district_scores.values()) + answers.district_summary(district_scores, justice_scores, history)
+
+def justice_row(turns):
+    scores = {c: s for c, (s, _) in turns.items()}
+    return tuple(scores.get(c) for c in answers.JUSTICE_SCORE_CATEGORIES) + (answers.justice_overall(scores),)
+
+ROW_BUILDERS = {"district_feedback": district_row, "justice_feedback": justice_row}
+
+def recompute_feedback(cur, session_keys):
+    # Re-derive the feedback rows of these sessions from their (re-scored) answers
+    keys = sorted(session_keys)
+    updated = Counter()
+    for i in range(0, len(keys), SESSION_BATCH):
+        batch = keys[i:i + SESSION_BATCH]
+        cur.execute("SELECT session_key, source, category, score, sentiment FROM feedback_answers "
+                    f"WHERE session_key IN ({', '.join(['%s'] * len(batch))}) ORDER BY id", batch)
+        sessions = {}
+        for key, source, category, score, sentiment in cur.fetchall():
+            # A later answer to the same category replaces the earlier one, as in the chat
+            sessions.setdefault((key, source), {})[category] = (score, sentiment)
+        params = {}
+        for (key, source), turns in sessions.items():
+            params.setdefault(source, []).append(ROW_BUILDERS[source](turns) + (key,))
+        for source, rows in params.items():
+            cur.executemany(UPDATE_FEEDBACK[source], rows)
+            updated[source] += cur.rowcount
+    return updated
+
+
+# ------------------ Checkpoint ------------------
+def load_checkpoint(source, path=CHECKPOINT_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("source") == source else None
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# ------------------ Run ------------------
+def _changed(row, score, sentiment):
+    return row["score"] is None or abs(row["score"] - score) > 1e-6 or row["sentiment"] != sentiment
+
+def rescore(source=None, dry_run=False, restart=False, chunk_size=CHUNK_SIZE, workers=None):
+    workers = workers or os.cpu_count() or 1
+    checkpoint = None if (dry_run or restart) else load_checkpoint(source)
+    checkpoint = checkpoint or {"source": source, "last_id": 0, "rollups_stale": False}
+    checkpoint.setdefault("snapshot_stale", [])
+
+    sql, params = SELECT_ANSWERS, [checkpoint["last_id"]]
+    if source:
+        sql += " AND source = %s"
+        params.append(source)
+    sql += " ORDER BY id"
+
+    report = {"scanned": 0, "changed": 0, "skipped": 0, "score_changes": Counter(), "sentiment_changes": Counter(),
+              "by_category": Counter(), "feedback_updated": Counter(), "samples": []}
+    chunks = db.stream(sql, tuple(params), chunk_size, dictionary=True)
+    try:
+        for chunk, scores in scored_chunks(chunks, workers):
+            scores = {answer_id: (score, sentiment) for answer_id, score, sentiment in scores}
+            updates, sessions = [], set()
+            for row in chunk:
+                if row["id"] not in scores:
+                    report["skipped"] += 1
+                    continue
+                score, sentiment = scores[row["id"]]
+                if not _changed(row, score, sentiment):
+                    continue
+                updates.append((score, sentiment, row["id"]))
+                sessions.add(row["session_key"])
+                report["score_changes"][(row["score"], score)] += 1
+                report["sentiment_changes"][(row["sentiment"], sentiment)] += 1
+                report["by_category"][(row["source"], row["category"])] += 1
+                if len(report["samples"]) < SAMPLE_SIZE:
+                    report["samples"].append((row["id"], row["category"], (row["answer"] or "")[:60],
+                                              row["score"], score, row["sentiment"], sentiment))
+            report["scanned"] += len(chunk)
+            report["changed"] += len(updates)
+
+            if dry_run:
+                continue
+            if updates:
+                with db.cursor(commit=True) as cur:
+                    cur.executemany(UPDATE_ANSWER, updates)
+                    report["feedback_updated"].update(recompute_feedback(cur, sessions))
+                if report["feedback_updated"]["justice_feedback"]:
+                    checkpoint["rollups_stale"] = True
+                checkpoint["snapshot_stale"] = sorted(set(checkpoint["snapshot_stale"]) |
+                                                      {t for t, n in report["feedback_updated"].items() if n})
+            checkpoint["last_id"] = chunk[-1]["id"]
+            save_checkpoint(checkpoint)
+    finally:
+        chunks.close()
+
+    if not dry_run:
+        if checkpoint["rollups_stale"]:
+            rollups.rebuild()  # district / monthly means read the updated justice_feedback scores
+        for table in checkpoint["snapshot_stale"]:
+            feedback_snapshot.invalidate(table)  # appends by id would never pick up the new scores
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)  # finished: the next run starts from the first answer
+    return report
+
+def print_report(report, dry_run):
+    print(f"{'Would change' if dry_run else 'Changed'} {report['changed']} of {report['scanned']} answers")
+    if report["skipped"]:
+        print(f"Skipped {report['skipped']} non-English answers stored without their translation")
+    for (source, category), n in sorted(report["by_category"].items()):
+        print(f"  {source:18} {category:20} {n}")
+    if report["score_changes"]:
+        print("Score changes (old -> new):")
+        for (old, new), n in report["score_changes"].most_common(20):
+            print(f"  {old} -> {new}: {n}")
+    if report["sentiment_changes"]:
+        print("Sentiment changes:")
+        for (old, new), n in report["sentiment_changes"].most_common():
+            print(f"  {old} -> {new}: {n}")
+    if report["samples"]:
+        print("Examples:")
+        for answer_id, category, text, old, new, old_s, new_s in report["samples"]:
+            print(f"  #{answer_id} [{category}] {text!r}: {old}/{old_s} -> {new}/{new_s}")
+    for source, n in sorted(report["feedback_updated"].items()):
+        print(f"Updated {n} {source} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score stored chat answers with the current scoring rules")
+    parser.add_argument("--source", choices=answers.SOURCES)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--restart", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    result = rescore(args.source, args.dry_run, args.restart, args.chunk_size, args.workers)
+    print_report(result, args.dry_run)
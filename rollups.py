@@ -0,0 +1,197 @@
+import sys
+
+import db
+
+# Pre-aggregated justice_feedback statistics for powerbiapp.py.
+# Running sums and non-null counts per district and per (district, month) are
+# updated in the same transaction that inserts the feedback rows, so the
+# dashboard and heatmap read a few rows per district instead of the whole table.
+#
+#   python rollups.py --rebuild     recompute both tables from justice_feedback
+
+# Column order of INSERT_FEEDBACK in project.py
+JUSTICE_INSERT_COLUMNS = ("district", "trust_score", "responsiveness_score", "fairness_score",
+                          "accessibility_score", "corruption_score", "community_justice_score",
+                          "suggestions", "justice_sentiment", "overall_score", "session_key")
+
+SCORE_COLUMNS = ["trust_score", "responsiveness_score", "fairness_score", "accessibility_score",
+                 "corruption_score", "community_justice_score", "overall_score", "justice_index"]
+
+# Rows with no district are kept under '' so the totals still include them
+NO_DISTRICT = ""
+
+_score_ddl = ",\n".join(f"    {c}_sum DOUBLE NOT NULL DEFAULT 0,\n    {c}_count INT NOT NULL DEFAULT 0"
+                        for c in SCORE_COLUMNS)
+
+DISTRICT_STATS_DDL = f"""
+CREATE TABLE IF NOT EXISTS justice_district_stats (
+    district VARCHAR(255) PRIMARY KEY,
+    feedback_count INT NOT NULL DEFAULT 0,
+    above_three_count INT NOT NULL DEFAULT 0,
+    positive_count INT NOT NULL DEFAULT 0,
+    negative_count INT NOT NULL DEFAULT 0,
+{_score_ddl}
+)
+"""
+
+MONTHLY_STATS_DDL = """
+CREATE TABLE IF NOT EXISTS justice_monthly_stats (
+    district VARCHAR(255),
+    month CHAR(7),
+    feedback_count INT NOT NULL DEFAULT 0,
+    overall_score_sum DOUBLE NOT NULL DEFAULT 0,
+    overall_score_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (district, month)
+)
+"""
+
+# Bumped by every rebuild(): rewritten rows (rescore.py) leave the counts unchanged,
+# so feedback_queries.data_version() needs this to notice them
+REVISION_DDL = """
+CREATE TABLE IF NOT EXISTS justice_stats_revision (
+    id INT PRIMARY KEY,
+    revision BIGINT NOT NULL DEFAULT 0
+)
+"""
+
+DISTRICT_FIELDS = (["feedback_count", "above_three_count", "positive_count", "negative_count"]
+                   + [f"{c}_{part}" for c in SCORE_COLUMNS for part in ("sum", "count")])
+MONTHLY_FIELDS = ["feedback_count", "overall_score_sum", "overall_score_count"]
+
+
+def _upsert_sql(table, keys, fields):
+    columns = keys + fields
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE " + ", ".join(f"{f} = {f} + VALUES({f})" for f in fields))
+
+UPSERT_DISTRICT = _upsert_sql("justice_district_stats", ["district"], DISTRICT_FIELDS)
+UPSERT_MONTHLY = _upsert_sql("justice_monthly_stats", ["district", "month"], MONTHLY_FIELDS)
+
+
+# ------------------ Maintenance ------------------
+def ensure_tables():
+    with db.cursor(commit=True) as cur:
+        cur.execute(DISTRICT_STATS_DDL)
+        cur.execute(MONTHLY_STATS_DDL)
+        cur.execute(REVISION_DDL)
+        cur.execute("SELECT COUNT(*) FROM justice_district_stats")
+        empty = cur.fetchone()[0] == 0
+    if empty:
+        # First run against an existing justice_feedback table: seed from history
+        rebuild()
+
+def justice_index(row):
+    parts = (row["trust_score"], row["responsiveness_score"], row["community_justice_score"])
+    if any(p is None for p in parts):
+        return None
+    return 0.4 * parts[0] + 0.3 * parts[1] + 0.3 * parts[2]
+
+def record_justice_feedback(cur, rows, month=None):
+    # FeedbackWriter after_write hook: rows are INSERT_FEEDBACK tuples just written with cur.
+    # The month comes from the database clock, as created_at (and so rebuild()) does, not
+    # from the app server's, which may be in another timezone
+    if month is None:
+        cur.execute("SELECT DATE_FORMAT(CURRENT_TIMESTAMP, '%Y-%m')")
+        month = cur.fetchone()[0]
+    districts, months = {}, {}
+    for values in rows:
+        row = dict(zip(JUSTICE_INSERT_COLUMNS, values))
+        row["justice_index"] = justice_index(row)
+        district = row["district"] if row["district"] is not None else NO_DISTRICT
+        overall = row["overall_score"]
+
+        d = districts.setdefault(district, dict.fromkeys(DISTRICT_FIELDS, 0))
+        d["feedback_count"] += 1
+        if overall is not None:
+            d["above_three_count"] += overall > 3
+            d["positive_count"] += overall >= 4
+            d["negative_count"] += overall <= 2
+        for c in SCORE_COLUMNS:
+            if row[c] is not None:
+                d[f"{c}_sum"] += row[c]
+                d[f"{c}_count"] += 1
+
+        m = months.setdefault((district, month), dict.fromkeys(MONTHLY_FIELDS, 0))
+        m["feedback_count"] += 1
+        if overall is not None:
+            m["overall_score_sum"] += overall
+            m["overall_score_count"] += 1
+
+    cur.executemany(UPSERT_DISTRICT, [(k,) + tuple(v[f] for f in DISTRICT_FIELDS) for k, v in districts.items()])
+    cur.executemany(UPSERT_MONTHLY, [k + tuple(v[f] for f in MONTHLY_FIELDS) for k, v in months.items()])
+
+def rebuild():
+    index_expr = "0.4*trust_score + 0.3*responsiveness_score + 0.3*community_justice_score"
+    sums = ", ".join(f"COALESCE(SUM({index_expr if c == 'justice_index' else c}), 0), "
+                     f"COUNT({index_expr if c == 'justice_index' else c})" for c in SCORE_COLUMNS)
+    with db.cursor(commit=True) as cur:
+        cur.execute(REVISION_DDL)
+        cur.execute("INSERT INTO justice_stats_revision (id, revision) VALUES (1, 1) "
+                    "ON DUPLICATE KEY UPDATE revision = revision + 1")
+        cur.execute("DELETE FROM justice_district_stats")
+        cur.execute("DELETE FROM justice_monthly_stats")
+        cur.execute(f"""
+            INSERT INTO justice_district_stats (district, {', '.join(DISTRICT_FIELDS)})
+            SELECT COALESCE(district, ''), COUNT(*),
+                   COALESCE(SUM(overall_score > 3), 0), COALESCE(SUM(overall_score >= 4), 0),
+                   COALESCE(SUM(overall_score <= 2), 0), {sums}
+            FROM justice_feedback GROUP BY COALESCE(district, '')
+        """)
+        cur.execute("SHOW COLUMNS FROM justice_feedback LIKE 'created_at'")
+        if cur.fetchall():
+            cur.execute("""
+                INSERT INTO justice_monthly_stats (district, month, feedback_count,
+                                                   overall_score_sum, overall_score_count)
+                SELECT COALESCE(district, ''), DATE_FORMAT(created_at, '%Y-%m'), COUNT(*),
+                       COALESCE(SUM(overall_score), 0), COUNT(overall_score)
+                FROM justice_feedback WHERE created_at IS NOT NULL
+                GROUP BY COALESCE(district, ''), DATE_FORMAT(created_at, '%Y-%m')
+            """)
+
+
+# ------------------ Reads ------------------
+def _mean(row, column):
+    count = row[f"{column}_count"]
+    return row[f"{column}_sum"] / count if count else None
+
+def district_stats(district=None):
+    # One dict per district with counts and the mean of every score column
+    sql = "SELECT * FROM justice_district_stats"
+    params = None
+    if district is not None:
+        sql += " WHERE district = %s"
+        params = (district,)
+    stats = []
+    for row in db.fetchall(sql, params, dictionary=True):
+        entry = {"district": row["district"], "feedback_count": row["feedback_count"],
+                 "above_three_count": row["above_three_count"],
+                 "positive_count": row["positive_count"], "negative_count": row["negative_count"]}
+        for c in SCORE_COLUMNS:
+            entry[c] = _mean(row, c)
+            entry[f"{c}_sum"] = row[f"{c}_sum"]
+            entry[f"{c}_count"] = row[f"{c}_count"]
+        stats.append(entry)
+    return stats
+
+def monthly_overall(district=None):
+    # [(month, mean overall_score)] in month order
+    sql = "SELECT month, SUM(overall_score_sum) AS s, SUM(overall_score_count) AS n FROM justice_monthly_stats"
+    params = None
+    if district is not None:
+        sql += " WHERE district = %s"
+        params = (district,)
+    sql += " GROUP BY month ORDER BY month"
+    return [(row["month"], float(row["s"]) / int(row["n"])) for row in db.fetchall(sql, params, dictionary=True) if row["n"]]
+
+def district_means(column="overall_score"):
+    return {s["district"]: s[column] for s in district_stats()
+            if s["district"] != NO_DISTRICT and s[column] is not None}
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        ensure_tables()
+        rebuild()
+        print("justice_district_stats / justice_monthly_stats rebuilt")
+    else:
+        print("usage: python rollups.py --rebuild")
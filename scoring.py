@@ -0,0 +1,100 @@
+from collections import Counter, namedtuple
+from textblob.en import sentiment as pattern_sentiment
+
+# Shared single-pass scoring for app.py / project.py.
+# Each answer is run through the pattern sentiment lexicon once and split once;
+# the category score, polarity bucket and sentiment label all come from that pass.
+
+AnswerScore = namedtuple("AnswerScore", ["score", "polarity_score", "sentiment"])
+
+# Category keywords for app.py (district feedback) and project.py (justice feedback).
+# Kept here so rescore.py scores history with exactly what the apps use.
+DISTRICT_KEYWORDS = {
+    "trust": ["trust", "honest", "transparent", "reliable"],
+    "responsiveness": ["fast", "responsive", "quick", "helpful"],
+    "infrastructure": ["road", "transport", "building", "infrastructure", "utilities"],
+    "public_services": ["health", "education", "hospital", "school", "sanitation"],
+    "safety": ["safe", "security", "police", "crime", "danger"],
+    "environment": ["clean", "pollution", "green", "environment", "waste"],
+    "transport": ["bus", "train", "road", "traffic", "transport"],
+    "community": ["community", "participation", "citizen", "involvement"],
+    "economic": ["job", "business", "opportunity", "economy", "market"],
+    "justice": ["justice", "law", "fair", "rights", "court", "equality"]
+}
+
+JUSTICE_KEYWORDS = {
+    "trust": ["trust", "honest", "reliable", "transparent"],
+    "responsiveness": ["fast", "responsive", "quick", "helpful"],
+    "fairness": ["fair", "unfair", "bias", "impartial", "justice"],
+    "accessibility": ["access", "reachable", "available", "easy", "helpful"],
+    "corruption": ["corrupt", "bribe", "unfair", "illegal", "fraud"],
+    "community_justice": ["community", "local", "participation", "resolve", "fair"],
+    "timely_resolution": ["timely", "delay", "slow", "efficient", "quick"],
+    "legal_awareness": ["aware", "knowledge", "rights", "inform", "understand"],
+    "support_services": ["aid", "support", "counsel", "assistance", "help"],
+    "police_cooperation": ["police", "cooperate", "helpful", "support"]
+}
+
+
+# ------------------ Polarity ------------------
+def polarity_of(text):
+    # Same lexicon TextBlob(text).sentiment uses, without building a blob
+    # (and a fresh namedtuple class) for every answer
+    return pattern_sentiment(text)[0]
+
+def polarity_bucket(polarity):
+    if polarity <= -0.6: return 1
+    elif polarity <= -0.2: return 2
+    elif polarity <= 0.2: return 3
+    elif polarity <= 0.6: return 4
+    else: return 5
+
+def sentiment_label(polarity):
+    if polarity > 0.1: return "positive"
+    elif polarity < -0.1: return "negative"
+    else: return "neutral"
+
+
+# ------------------ Keywords ------------------
+def build_keyword_index(keywords_dict):
+    # token -> {category: number of times the token is listed for it}
+    index = {}
+    for category, keywords in keywords_dict.items():
+        for word in keywords:
+            index.setdefault(word, Counter())[category] += 1
+    return index
+
+def keyword_matches(tokens, category, index):
+    matches = 0
+    for token in tokens:
+        hits = index.get(token)
+        if hits:
+            matches += hits.get(category, 0)
+    return matches
+
+def keyword_score(text, category, index):
+    tokens = set(text.lower().split())
+    return min(keyword_matches(tokens, category, index) + 1, 5)
+
+
+# ------------------ Combined ------------------
+def score_answer(text, category, index):
+    polarity = polarity_of(text)
+    p_score = polarity_bucket(polarity)
+    k_score = keyword_score(text, category, index)
+    return AnswerScore(round((p_score + k_score) / 2, 2), p_score, sentiment_label(polarity))
+
+def score_batch(texts, categories, index):
+    # score_answer over many (text, category) pairs; repeated answers ("good", "no")
+    # are looked up in the sentiment lexicon only once per batch
+    polarities = {}
+    scores = []
+    for text, category in zip(texts, categories):
+        text = text or ""
+        polarity = polarities.get(text)
+        if polarity is None:
+            polarity = polarities[text] = polarity_of(text)
+        p_score = polarity_bucket(polarity)
+        k_score = min(keyword_matches(set(text.lower().split()), category, index) + 1, 5)
+        scores.append(AnswerScore(round((p_score + k_score) / 2, 2), p_score, sentiment_label(polarity)))
+    return scores
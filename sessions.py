@@ -0,0 +1,232 @@
+import copy
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Opt-in server-side chat sessions for app.py / project.py.
+# With a store configured, start_chat keeps session_data on the server and the
+# client only carries a session id, so /next_question payloads stay the same size
+# however long the conversation runs. Without one, the session round-trips as before.
+#
+#   LAWBOT_SESSION_STORE=memory               in-process only
+#   LAWBOT_SESSION_STORE=sqlite:sessions.db   in-process, written through to SQLite
+#   LAWBOT_SESSION_STORE=disk:sessions/       in-process, written through to JSON files
+#
+# With a backend, each saved session has a version (its update time); the
+# in-process copy is only used while the backend still has that version, so
+# workers sharing a backend (prefork.py) never serve each other's stale turns.
+
+
+# ------------------ Backends ------------------
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions (id TEXT PRIMARY KEY, data TEXT, updated REAL)")
+        self._conn().commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    def load(self, sid, since):
+        # (data, version) or None
+        row = self._conn().execute("SELECT data, updated FROM chat_sessions WHERE id = ? AND updated >= ?",
+                                   (sid, since)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def version(self, sid):
+        row = self._conn().execute("SELECT updated FROM chat_sessions WHERE id = ?", (sid,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid, data, updated):
+        conn = self._conn()
+        conn.execute("REPLACE INTO chat_sessions (id, data, updated) VALUES (?, ?, ?)",
+                     (sid, json.dumps(data), updated))
+        conn.commit()
+        return updated
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute("DELETE FROM chat_sessions WHERE id = ?", (sid,))
+        conn.commit()
+
+    def expire(self, before):
+        conn = self._conn()
+        conn.execute("DELETE FROM chat_sessions WHERE updated < ?", (before,))
+        conn.commit()
+
+
+class DiskBackend:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, sid + ".json")
+
+    def load(self, sid, since):
+        # (data, version) or None
+        try:
+            with open(self._path(sid), encoding="utf-8") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_mtime < since:
+                    return None
+                return json.load(f), _file_version(stat)
+        except (OSError, ValueError):
+            return None
+
+    def version(self, sid):
+        try:
+            return _file_version(os.stat(self._path(sid)))
+        except OSError:
+            return None
+
+    def save(self, sid, data, updated):
+        tmp = self._path(sid) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._path(sid))
+        return _file_version(os.stat(self._path(sid)))
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except OSError:
+            pass
+
+    def expire(self, before):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < before:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+# ------------------ Store ------------------
+class SessionStore:
+    def __init__(self, backend=None, max_sessions=10000, idle_timeout=1800, sweep_interval=60):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._sessions = OrderedDict()  # sid -> (data, last_seen, backend version), oldest first
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def get(self, sid):
+        if not sid:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry is not None:
+            data, last_seen, version = entry
+            fresh = now - last_seen <= self.idle_timeout
+            if self.backend is None and not fresh:
+                self.delete(sid)
+                return None
+            # Another worker may have saved a later turn: only trust the copy it still matches
+            if fresh and (self.backend is None or self.backend.version(sid) == version):
+                self._remember(sid, data, now, version)
+                # A copy: a request that fails after changing it must not leave a half-done turn here
+                return copy.deepcopy(data)
+            with self._lock:
+                self._sessions.pop(sid, None)
+        if self.backend is None or not _valid_id(sid):
+            return None
+        # Evicted from memory, out of date, or started by another worker: load from the backend
+        loaded = self.backend.load(sid, now - self.idle_timeout)
+        if loaded is None:
+            return None
+        data, version = loaded
+        self._remember(sid, data, now, version)
+        return copy.deepcopy(data)
+
+    def put(self, sid, data):
+        now = time.time()
+        version = self.backend.save(sid, data, now) if self.backend is not None else None
+        self._remember(sid, data, now, version)
+        if now - self._last_sweep > self.sweep_interval:
+            self.sweep(now)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+        if self.backend is not None:
+            self.backend.delete(sid)
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        self._last_sweep = now
+        cutoff = now - self.idle_timeout
+        with self._lock:
+            while self._sessions:
+                sid, (_, last_seen, _) = next(iter(self._sessions.items()))
+                if last_seen >= cutoff:
+                    break
+                del self._sessions[sid]
+        if self.backend is not None:
+            self.backend.expire(cutoff)
+
+    def _remember(self, sid, data, now, version=None):
+        with self._lock:
+            self._sessions[sid] = (data, now, version)
+            self._sessions.move_to_end(sid)
+            # Memory cap: drop least recently used sessions (the backend still has them)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def _file_version(stat):
+    # Every save replaces the file, so the inode changes even when the mtime (coarse on
+    # some filesystems) doesn't
+    return stat.st_ino, stat.st_mtime_ns
+
+def _valid_id(sid):
+    return isinstance(sid, str) and sid.replace("-", "").replace("_", "").isalnum()
+
+
+def store_from_env(env=None):
+    spec = (env if env is not None else os.environ.get("LAWBOT_SESSION_STORE", "")).strip()
+    if not spec:
+        return None
+    kind, _, target = spec.partition(":")
+    if kind == "memory":
+        return SessionStore()
+    if kind == "sqlite":
+        return SessionStore(SQLiteBackend(target or "sessions.db"))
+    if kind == "disk":
+        return SessionStore(DiskBackend(target or "sessions"))
+    raise ValueError(f"Unknown LAWBOT_SESSION_STORE: {spec}")
+
+
+# ------------------ Request helpers ------------------
+def client_payload(store, session_data):
+    # What the client has to send back on the next /next_question
+    if store is None:
+        return {"session": session_data}
+    sid = session_data.setdefault("id", secrets.token_urlsafe(16))
+    store.put(sid, session_data)
+    return {"session_id": sid}
+
+def load(store, data):
+    if store is None:
+        return data.get("session")
+    return store.get(data.get("session_id"))
+
+def discard(store, session_data):
+    if store is not None and "id" in session_data:
+        store.delete(session_data["id"])
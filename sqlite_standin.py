@@ -0,0 +1,182 @@
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# SQLite stand-in for the MySQL database, for benchmarks (bench.py) and offline runs.
+# StandinPool has the same connection() / stats() interface as db.ConnectionPool;
+# install it with db.set_pool(StandinPool(path)) before importing an app. The
+# MySQL dialect these modules use (%s placeholders, AUTO_INCREMENT, inline
+# INDEX clauses, SHOW COLUMNS / SHOW INDEX, ON DUPLICATE KEY UPDATE,
+# DATE_FORMAT) is rewritten to SQLite on the way in.
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE IF NOT EXISTS (\w+)", re.I)
+_INLINE_INDEX = re.compile(r",\s*INDEX\s+(\w+)\s*\(([^)]*)\)", re.I)
+_ALTER_ADD = re.compile(r"ALTER TABLE (\w+) (.*)", re.I | re.S)
+_RULES = [
+    (re.compile(r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"SHOW COLUMNS FROM (\w+) LIKE '(\w+)'", re.I), r"SELECT name FROM pragma_table_info('\1') WHERE name = '\2'"),
+    (re.compile(r"SHOW INDEX FROM (\w+) WHERE Key_name = '(\w+)'", re.I), r"SELECT name FROM pragma_index_list('\1') WHERE name = '\1_\2'"),
+    (re.compile(r"CREATE INDEX (\w+) ON (\w+)", re.I), r"CREATE INDEX IF NOT EXISTS \2_\1 ON \2"),
+    (re.compile(r"DATE_FORMAT\((\w+),\s*'([^']*)'\)", re.I), r"strftime('\2', \1)"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE", re.I), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+    (re.compile(r"%s"), "?"),
+]
+
+_translated = {}
+
+def translate(sql):
+    # MySQL statement -> list of SQLite statements (index names are prefixed with the table)
+    statements = _translated.get(sql)
+    if statements is not None:
+        return statements
+    statements = []
+    created = _CREATE_TABLE.search(sql)
+    altered = _ALTER_ADD.match(sql.strip())
+    if created:
+        table = created.group(1)
+        indexes = _INLINE_INDEX.findall(sql)
+        statements.append(_INLINE_INDEX.sub("", sql))
+        statements += [f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({cols})" for name, cols in indexes]
+    elif altered:
+        # SQLite takes one change per ALTER TABLE
+        table = altered.group(1)
+        for clause in re.split(r",\s*(?=ADD\b)", altered.group(2), flags=re.I):
+            index = re.match(r"ADD INDEX (\w+)\s*\(([^)]*)\)", clause, re.I)
+            if index:
+                statements.append(f"CREATE INDEX IF NOT EXISTS {table}_{index.group(1)} ON {table} ({index.group(2)})")
+            else:
+                statements.append(f"ALTER TABLE {table} {clause}")
+    else:
+        statements.append(sql)
+    for pattern, replacement in _RULES:
+        statements = [pattern.sub(replacement, s) for s in statements]
+    _translated[sql] = statements
+    return statements
+
+
+class StandinCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    def execute(self, sql, params=None):
+        *setup, last = translate(sql)
+        for statement in setup:
+            self._cursor.execute(statement)
+        self._cursor.execute(last, tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(translate(sql)[-1], [tuple(p) for p in seq_params])
+
+    def _rows(self, rows):
+        if not self.dictionary:
+            return rows
+        names = [d[0] for d in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return row if row is None else self._rows([row])[0]
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def fetchmany(self, size=None):
+        return self._rows(self._cursor.fetchmany(size or self._cursor.arraysize))
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandinConnection(sqlite3.Connection):
+    # A real sqlite3.Connection (so pandas.read_sql accepts it) with a MySQL-flavoured cursor()
+    unread_result = False
+
+    def cursor(self, dictionary=False, buffered=True, **_):
+        return StandinCursor(super().cursor(), dictionary)
+
+    def consume_results(self):
+        pass
+
+    def ping(self, **_):
+        pass
+
+
+class StandinPool:
+    def __init__(self, path, size=5, timeout=10.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._slots = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)
+        self._lock = threading.Lock()
+        self._stats = {"checkouts": 0, "checked_out": 0, "wait_total": 0.0, "wait_max": 0.0,
+                       "timeouts": 0, "created": 0, "reconnects": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, factory=StandinConnection)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        conn = self._slots.get(timeout=self.timeout)
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checked_out"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+            if conn is None:
+                self._stats["created"] += 1
+        conn = conn or self._connect()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                self._stats["checked_out"] -= 1
+            self._slots.put(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["idle"] = self._slots.qsize()
+        stats["wait_avg"] = stats["wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+        for _ in range(self.size):
+            self._slots.put(None)
@@ -0,0 +1,133 @@
+import importlib.util
+import os
+import re
+import sys
+from collections import Counter
+
+import db
+from rollups import JUSTICE_INSERT_COLUMNS, NO_DISTRICT
+
+# Term frequencies of the justice_feedback suggestions, per district.
+# Counts are added as feedback rows are written, so the dashboard word cloud is
+# drawn from (term, count) pairs and its cost depends on the vocabulary size
+# rather than on how much feedback has ever been collected. Terms are counted
+# as tokenized, without WordCloud's plural normalization or collocations.
+#
+#   python term_index.py --rebuild     recount everything from justice_feedback
+
+TERMS_DDL = """
+CREATE TABLE IF NOT EXISTS suggestion_terms (
+    district VARCHAR(255),
+    term VARCHAR(100),
+    freq INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (district, term)
+)
+"""
+
+# One row once a full count has run, so an index that is legitimately empty (no
+# suggestions yet) isn't rebuilt on every start
+META_DDL = """
+CREATE TABLE IF NOT EXISTS suggestion_terms_meta (
+    name VARCHAR(32) PRIMARY KEY,
+    built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+MARK_BUILT = ("INSERT INTO suggestion_terms_meta (name) VALUES ('rebuilt') "
+              "ON DUPLICATE KEY UPDATE built_at = CURRENT_TIMESTAMP")
+
+UPSERT_TERMS = ("INSERT INTO suggestion_terms (district, term, freq) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE freq = freq + VALUES(freq)")
+
+# Same word pattern WordCloud uses when it tokenizes raw text
+TOKEN_RE = re.compile(r"\w[\w']*")
+MAX_TERM_LENGTH = 100
+
+
+def _load_stopwords():
+    # WordCloud's stopword list, read from its package without importing it (and matplotlib)
+    spec = importlib.util.find_spec("wordcloud")
+    if spec is None or spec.origin is None:
+        return frozenset()
+    try:
+        with open(os.path.join(os.path.dirname(spec.origin), "stopwords"), encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f if line.strip())
+    except OSError:
+        return frozenset()
+
+STOPWORDS = _load_stopwords()
+
+
+def tokenize(text):
+    terms = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word.endswith("'s"):
+            word = word[:-2]
+        if not word or word in STOPWORDS or word.isdigit() or len(word) > MAX_TERM_LENGTH:
+            continue
+        terms.append(word)
+    return terms
+
+
+# ------------------ Maintenance ------------------
+def ensure_tables():
+    with db.cursor(commit=True) as cur:
+        cur.execute(TERMS_DDL)
+        cur.execute(META_DDL)
+        cur.execute("SELECT COUNT(*) FROM suggestion_terms_meta WHERE name = 'rebuilt'")
+        built = cur.fetchone()[0] > 0
+    if not built:
+        rebuild()
+
+def count_terms(rows):
+    # rows: (district, suggestions) pairs -> Counter of (district, term)
+    counts = Counter()
+    for district, text in rows:
+        if text:
+            district = district if district is not None else NO_DISTRICT
+            counts.update((district, term) for term in tokenize(str(text)))
+    return counts
+
+def record_suggestions(cur, rows):
+    # FeedbackWriter after_write hook: rows are project.py INSERT_FEEDBACK tuples
+    d, s = JUSTICE_INSERT_COLUMNS.index("district"), JUSTICE_INSERT_COLUMNS.index("suggestions")
+    counts = count_terms((row[d], row[s]) for row in rows)
+    if counts:
+        cur.executemany(UPSERT_TERMS, [(district, term, n) for (district, term), n in counts.items()])
+
+def rebuild(chunk_size=5000):
+    counts = Counter()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT district, suggestions FROM justice_feedback WHERE suggestions IS NOT NULL AND suggestions <> ''")
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            counts.update(count_terms(chunk))
+        cur.close()
+    with db.cursor(commit=True) as cur:
+        cur.execute("DELETE FROM suggestion_terms")
+        rows = [(district, term, n) for (district, term), n in counts.items()]
+        for i in range(0, len(rows), chunk_size):
+            cur.executemany(UPSERT_TERMS, rows[i:i + chunk_size])
+        cur.execute(MARK_BUILT)
+
+
+# ------------------ Reads ------------------
+def top_terms(district=None, n=200):
+    if district is None:
+        sql = "SELECT term, SUM(freq) FROM suggestion_terms GROUP BY term ORDER BY SUM(freq) DESC, term LIMIT %s"
+        params = (n,)
+    else:
+        sql = "SELECT term, freq FROM suggestion_terms WHERE district = %s ORDER BY freq DESC, term LIMIT %s"
+        params = (district, n)
+    return [(term, int(freq)) for term, freq in db.fetchall(sql, params)]
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        ensure_tables()
+        rebuild()
+        print("suggestion_terms rebuilt")
+    else:
+        print("usage: python term_index.py --rebuild")
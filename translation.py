@@ -0,0 +1,348 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import language_detect
+import metrics
+import prefork
+
+# Caching layer in front of googletrans.Translator, shared by app.py / project.py.
+# Translations are cached by (text, src, dest) and detections by text, both in a
+# bounded LRU with a TTL. Languages we have seen are remembered on disk so the
+# fixed question texts can be translated into them before the first user asks.
+# Detection tries the offline detector first and only asks googletrans when it
+# is not confident. Every call that reaches googletrans goes through a
+# TranslationGateway, which bounds it and falls back to the untranslated text.
+
+SEEN_LANGUAGES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seen_languages.json")
+# Async mode: translations run on a thread pool with a per-call timeout (0 workers = inline)
+TRANSLATE_WORKERS = int(os.environ.get("LAWBOT_TRANSLATE_WORKERS", "0"))
+TRANSLATE_TIMEOUT = float(os.environ.get("LAWBOT_TRANSLATE_TIMEOUT", "3"))
+# Gateway: backend calls in flight, per-call deadline, how long to wait for a free
+# slot, and consecutive failures that open the breaker / seconds it stays open
+TRANSLATE_MAX_IN_FLIGHT = int(os.environ.get("LAWBOT_TRANSLATE_MAX_IN_FLIGHT", "8"))
+TRANSLATE_DEADLINE = float(os.environ.get("LAWBOT_TRANSLATE_DEADLINE", "2"))
+TRANSLATE_QUEUE_WAIT = float(os.environ.get("LAWBOT_TRANSLATE_QUEUE_WAIT", "0.05"))
+BREAKER_FAILURES = int(os.environ.get("LAWBOT_TRANSLATE_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("LAWBOT_TRANSLATE_BREAKER_COOLDOWN", "30"))
+
+
+class TranslationUnavailable(Exception):
+    pass
+
+
+# ------------------ LRU / TTL cache ------------------
+class LRUCache:
+    def __init__(self, maxsize=2048, ttl=24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if self.ttl is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ------------------ Gateway ------------------
+# Admission control in front of googletrans (same detect() / translate() interface):
+#  - at most max_in_flight backend calls; a slot is held until the call really
+#    returns, so a hung backend cannot pile up threads
+#  - each caller waits at most `deadline` for its result
+#  - after `failures` consecutive errors / timeouts the breaker opens and calls
+#    are refused at once; after `cooldown` one probe call is let through
+#    (half-open) and its outcome closes or re-opens the breaker
+# Refused, failed and late calls raise TranslationUnavailable; callers fall back
+# to the untranslated text.
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class TranslationGateway:
+    def __init__(self, backend, max_in_flight=TRANSLATE_MAX_IN_FLIGHT, deadline=TRANSLATE_DEADLINE,
+                 queue_wait=TRANSLATE_QUEUE_WAIT, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.queue_wait = queue_wait
+        self.failure_threshold = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.counts = Counter()  # ok / error / timeout / rejected_open / rejected_busy
+        self._start()
+        prefork.register(after=lambda worker: self._start())
+
+    def _start(self):
+        # Also run in each prefork.py worker: the parent's backend threads do not survive the fork
+        self.in_flight = 0
+        self._probing = False
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="translate-backend")
+        self._lock = threading.Lock()
+
+    def detect(self, text):
+        return self._call("detect", self.backend.detect, text)
+
+    def translate(self, text, src="auto", dest="en"):
+        return self._call("translate", self.backend.translate, text, src=src, dest=dest)
+
+    def _admit(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False  # one probe at a time
+                self._probing = True
+            return True
+
+    def _refuse(self, op, reason):
+        with self._lock:
+            self.counts[f"rejected_{reason}"] += 1
+        metrics.inc("lawbot_translate_rejected_total", op=op, reason=reason)
+        raise TranslationUnavailable(f"{op}: {reason}")
+
+    def _record(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+            self._probing = False
+            if outcome == "ok":
+                self.consecutive_failures = 0
+                self.state = CLOSED
+                return
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.opened += 1
+
+    def _finished(self, _):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _call(self, op, fn, *args, **kwargs):
+        if not self._admit():
+            self._refuse(op, "open")
+        if not self._slots.acquire(timeout=self.queue_wait):
+            with self._lock:
+                self._probing = False
+            self._refuse(op, "busy")
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._finished)
+        error = None
+        try:
+            result = future.result(timeout=self.deadline)
+            outcome = "ok"
+        except FutureTimeout as exc:
+            outcome, error = "timeout", exc
+        except Exception as exc:
+            outcome, error = "error", exc
+        metrics.observe("lawbot_translate_backend_seconds", time.perf_counter() - start, op=op, outcome=outcome)
+        self._record(outcome)
+        if error is not None:
+            raise TranslationUnavailable(f"{op}: {outcome}") from error
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = {f"calls_{k}": v for k, v in self.counts.items()}
+            stats.update(in_flight=self.in_flight, consecutive_failures=self.consecutive_failures,
+                         breaker_state=BREAKER_STATES[self.state], breaker_opened=self.opened)
+        return stats
+
+
+# ------------------ Cached translator ------------------
+class CachedTranslator:
+    def __init__(self, translator, maxsize=2048, ttl=24 * 3600, seen_file=SEEN_LANGUAGES_FILE):
+        self.translator = translator
+        self.translations = LRUCache(maxsize, ttl)
+        self.detections = LRUCache(maxsize, ttl)
+        self.seen_file = seen_file
+        self.seen_languages = self._load_seen()
+        self.warm_texts = []
+        self.min_confidence = language_detect.MIN_CONFIDENCE
+        self.detector_stats = language_detect.DetectorStats()
+        self._seen_lock = threading.Lock()
+        self._warming = None
+        prefork.register(before=self.wait_warm)
+
+    def detect(self, text):
+        lang, confidence = language_detect.detect(text)
+        local = confidence >= self.min_confidence
+        self.detector_stats.record(confidence, local)
+        if not local:
+            cached = self.detections.get(text)
+            if cached is not None:
+                lang = cached
+            else:
+                try:
+                    lang = self.translator.detect(text).lang
+                    self.detections.set(text, lang)
+                except TranslationUnavailable:
+                    pass  # keep the offline guess
+        self.remember_language(lang)
+        return lang
+
+    def translate(self, text, src, dest):
+        key = (text, src, dest)
+        translated = self.translations.get(key)
+        if translated is None:
+            translated = self.translator.translate(text, src=src, dest=dest).text
+            self.translations.set(key, translated)
+        return translated
+
+    def stats(self):
+        stats = {"translation_hits": self.translations.hits, "translation_misses": self.translations.misses,
+                 "translation_cached": len(self.translations), "detection_hits": self.detections.hits,
+                 "detection_misses": self.detections.misses, "seen_languages": len(self.seen_languages)}
+        stats.update({f"detector_{k}": v for k, v in self.detector_stats.snapshot().items()})
+        return stats
+
+    # ---- pre-warming ----
+    def set_warm_texts(self, texts):
+        self.warm_texts = list(texts)
+
+    def prewarm(self, languages=None, background=True):
+        languages = list(self.seen_languages if languages is None else languages)
+        if not languages or not self.warm_texts:
+            return None
+        if background:
+            worker = self._warming = threading.Thread(target=self._prewarm, args=(languages,), daemon=True)
+            worker.start()
+            return worker
+        self._prewarm(languages)
+
+    def wait_warm(self):
+        # Let a background prewarm finish (prefork.py: before forking, so workers inherit the results)
+        if self._warming is not None:
+            self._warming.join()
+
+    def _prewarm(self, languages):
+        for lang in languages:
+            for text in self.warm_texts:
+                try:
+                    self.translate(text, "en", lang)
+                except Exception:
+                    # Warming is best effort; the request path will retry on demand
+                    return
+
+    def remember_language(self, lang):
+        if lang == "en" or lang in self.seen_languages:
+            return
+        with self._seen_lock:
+            if lang in self.seen_languages:
+                return
+            self.seen_languages.add(lang)
+            self._save_seen()
+        self.prewarm([lang])
+
+    def _load_seen(self):
+        if not self.seen_file:
+            return set()
+        try:
+            with open(self.seen_file, encoding="utf-8") as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            return set()
+
+    def _save_seen(self):
+        if not self.seen_file:
+            return
+        try:
+            with open(self.seen_file, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.seen_languages), f)
+        except OSError:
+            pass
+
+
+# ------------------ Concurrent pipeline ------------------
+# With workers > 0 translations are submitted to a shared thread pool, so a
+# request can start translating the next question while its answer is still
+# being translated and scored. Each wait is bounded by `timeout`; on a timeout
+# or a googletrans error the caller's fallback (the English text) is used.
+# With workers == 0 everything runs inline; only TranslationUnavailable (the
+# gateway refused or gave up) falls back, other errors propagate.
+class TranslationPipeline:
+    def __init__(self, translator, workers=TRANSLATE_WORKERS, timeout=TRANSLATE_TIMEOUT):
+        self.translator = translator
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="translate") if workers > 0 else None
+        self.timeouts = 0
+        self.errors = 0
+        if workers > 0:
+            prefork.register(after=lambda worker: setattr(
+                self, "executor", ThreadPoolExecutor(self.workers, thread_name_prefix="translate")))
+
+    def submit(self, text, src, dest):
+        if src == dest:
+            return _completed(text)
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(self.translator.translate(text, src, dest))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        return self.executor.submit(self.translator.translate, text, src, dest)
+
+    def result(self, future, fallback):
+        if self.executor is None:
+            try:
+                return future.result()
+            except TranslationUnavailable:
+                self.errors += 1
+                return fallback
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The call keeps running and still fills the cache for the next request
+            self.timeouts += 1
+        except Exception:
+            self.errors += 1
+        return fallback
+
+    def translate(self, text, src, dest):
+        return self.result(self.submit(text, src, dest), fallback=text)
+
+    def stats(self):
+        return {"timeouts": self.timeouts, "errors": self.errors}
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future